@@ -0,0 +1,344 @@
+# bench.py
+#
+# Offline benchmark suite for the login, scraping and storage stages.
+# Recorded x.com pages from fixtures/ are served through Playwright request routing, so no
+# account or network access is needed. Usage:
+#
+#   python bench.py                      # run every stage and compare against bench_baseline.json
+#   python bench.py --stages trends      # run selected stages only
+#   python bench.py --save-baseline      # store the results as the new baseline
+#
+# The exit code is 1 when any metric regressed beyond the tolerance.
+
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import tempfile
+import statistics
+import tracemalloc
+from contextlib import contextmanager
+from urllib.parse import urlparse, parse_qs
+
+# The scraper modules read credentials and settings from the environment when they are imported
+os.environ.setdefault("X_USERNAME", "bench_user")
+os.environ.setdefault("X_PASSWORD", "bench_password")
+os.environ.setdefault("X_EMAIL", "bench@example.com")
+os.environ.setdefault("X_SCREENSHOT_POLICY", "off")
+
+from playwright.async_api import async_playwright
+from playwright._impl._connection import Channel
+from login import XComLoginScraper
+from scrape import XComScraper
+from query import search_url
+from pool import PagePool
+from sinks import FanOut, JsonlSink, SqliteSink
+from mongo import MongoSink
+from timeline import parse_timeline_payload
+from config import TRENDING_TABS
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(BENCH_DIR, "fixtures")
+BASELINE_PATH = os.path.join(BENCH_DIR, "bench_baseline.json")
+
+# URL path prefix -> recorded page served for it. Anything else is aborted.
+# SearchTimeline requests are answered with search_timeline_<n>.json, where the page asks for the
+# next one through the bottom cursor of the previous payload.
+FIXTURE_ROUTES = [
+    ("/i/flow/login", "login.html"),
+    ("/home", "home.html"),
+    ("/explore/", "explore.html"),
+    ("/search", "search.html"),
+]
+CONTENT_TYPES = {".html": "text/html; charset=utf-8", ".json": "application/json"}
+
+# Metrics where lower is better; these are compared against the baseline
+METRICS = ["wall_time_s", "cpu_time_s", "ipc_round_trips", "bytes_served", "peak_memory_kib"]
+REPORTED = METRICS + ["items", "items_per_s"]
+
+class FixtureServer:
+    """
+    Serves the recorded pages for x.com requests and counts the bytes sent to the browser.
+    """
+
+    def __init__(self, routes=FIXTURE_ROUTES):
+        self.routes = routes
+        self.bodies = {}
+        self.bytes_served = 0
+        self.requests = 0
+
+    async def install(self, context):
+        await context.route("**/*", self._handle)
+
+    def _load(self, name: str) -> bytes:
+        if name not in self.bodies:
+            with open(os.path.join(FIXTURES_DIR, name), "rb") as f:
+                self.bodies[name] = f.read()
+        return self.bodies[name]
+
+    async def _handle(self, route):
+        url = urlparse(route.request.url)
+        self.requests += 1
+        if url.hostname and url.hostname.endswith("x.com"):
+            if url.path.endswith("/SearchTimeline"):
+                variables = json.loads(parse_qs(url.query).get("variables", ["{}"])[0])
+                await self._fulfill(route, f"{variables.get('cursor') or 'search_timeline_0'}.json")
+                return
+            for prefix, name in self.routes:
+                if url.path.startswith(prefix):
+                    await self._fulfill(route, name)
+                    return
+        await route.abort()  # Nothing leaves the machine
+
+    async def _fulfill(self, route, name: str):
+        if not os.path.exists(os.path.join(FIXTURES_DIR, name)):
+            await route.fulfill(status=404, body="")
+            return
+        body = self._load(name)
+        self.bytes_served += len(body)
+        await route.fulfill(
+            status=200,
+            body=body,
+            content_type=CONTENT_TYPES.get(os.path.splitext(name)[1], "text/plain"),
+        )
+
+class IpcCounter:
+    """
+    Counts the messages the Python client sends to the Playwright driver, i.e. IPC round trips.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    @contextmanager
+    def counting(self):
+        original_send = Channel._inner_send
+        original_send_no_reply = Channel.send_no_reply
+        counter = self
+
+        async def _inner_send(channel, *args, **kwargs):
+            counter.count += 1
+            return await original_send(channel, *args, **kwargs)
+
+        def send_no_reply(channel, *args, **kwargs):
+            counter.count += 1
+            return original_send_no_reply(channel, *args, **kwargs)
+
+        Channel._inner_send = _inner_send
+        Channel.send_no_reply = send_no_reply
+        try:
+            yield self
+        finally:
+            Channel._inner_send = original_send
+            Channel.send_no_reply = original_send_no_reply
+
+BENCH_TOPIC = {"name": "bench", "search_url": search_url("bench")}
+HARVEST_TARGET = 62  # Every post in the recorded timeline fixtures
+SINK_POSTS = 20000  # Posts written by the sink stages
+
+async def stage_login(page) -> int:
+    login_scraper = XComLoginScraper(page)
+    login_scraper.cookies_path = os.path.join(tempfile.gettempdir(), "bench_cookies.json")
+    await login_scraper.perform_login()
+    return 1
+
+async def stage_trends(page) -> int:
+    scraper = XComScraper(page)
+    await scraper.navigate_to_trending()
+    return len(await scraper.extract_topics())
+
+async def stage_trends_tabs(page) -> int:
+    scraper = XComScraper(page)
+    pool = PagePool(page.context, len(TRENDING_TABS))
+    try:
+        return await scraper.scrape_trending_tabs(pool)
+    finally:
+        await pool.close()
+
+async def stage_search(page) -> int:
+    scraper = XComScraper(page)
+    await scraper.visit_topic(page, BENCH_TOPIC)
+    return 1
+
+async def stage_harvest(page, mode: str) -> int:
+    scraper = XComScraper(page)
+    harvested = 0
+    async for _ in scraper.harvest_topic(page, BENCH_TOPIC, target=HARVEST_TARGET, deadline=30, mode=mode):
+        harvested += 1
+    return harvested
+
+async def stage_harvest_dom(page) -> int:
+    return await stage_harvest(page, "dom")
+
+async def stage_harvest_network(page) -> int:
+    return await stage_harvest(page, "network")
+
+def load_fixture_posts() -> list:
+    """
+    Every post of the recorded SearchTimeline payloads.
+    """
+    posts = []
+    for name in sorted(os.listdir(FIXTURES_DIR)):
+        if name.startswith("search_timeline_") and name.endswith(".json"):
+            with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+                posts.extend(parse_timeline_payload(json.load(f))[0])
+    return posts
+
+async def write_sink_posts(sink) -> int:
+    """
+    Write SINK_POSTS posts, the fixture posts repeated under new IDs, through a sink.
+    """
+    posts = load_fixture_posts()
+    for i in range(SINK_POSTS):
+        post = posts[i % len(posts)]
+        await sink.write({**post, "id": f"{post['id']}-{i}", "topic": BENCH_TOPIC["name"], "scraped_at": post["created_at"]})
+    await sink.close()
+    return SINK_POSTS
+
+async def stage_sink_sqlite(page) -> int:
+    with tempfile.TemporaryDirectory() as folder:
+        return await write_sink_posts(SqliteSink(os.path.join(folder, "bench.db"), "posts"))
+
+class BulkWriteRecorder:
+    """
+    Stands in for a MongoDB collection, so the sink's own overhead can be measured without mongod.
+    """
+
+    def __init__(self, latency: float = 0.005):
+        self.latency = latency  # Seconds per bulk write, roughly a local mongod
+        self.requests = 0
+
+    def bulk_write(self, requests, ordered=True):
+        time.sleep(self.latency)
+        self.requests += len(requests)
+
+async def stage_sink_mongo(page) -> int:
+    return await write_sink_posts(MongoSink("posts", key="id", collection=BulkWriteRecorder()))
+
+async def stage_sink_fanout(page) -> int:
+    with tempfile.TemporaryDirectory() as folder:
+        return await write_sink_posts(FanOut([
+            JsonlSink(os.path.join(folder, "bench.jsonl")),
+            SqliteSink(os.path.join(folder, "bench.db"), "posts"),
+            MongoSink("posts", key="id", collection=BulkWriteRecorder()),
+        ]))
+
+STAGES = {
+    "login": stage_login,
+    "trends": stage_trends,
+    "trends_tabs": stage_trends_tabs,
+    "search": stage_search,
+    "harvest_dom": stage_harvest_dom,
+    "harvest_network": stage_harvest_network,
+    "sink_sqlite": stage_sink_sqlite,
+    "sink_mongo": stage_sink_mongo,
+    "sink_fanout": stage_sink_fanout,
+}
+
+async def run_stage(browser, stage, iterations: int) -> dict:
+    """
+    Run one stage `iterations` times, each in a fresh context, and return the median of every metric.
+    """
+    samples = {metric: [] for metric in REPORTED}
+    counter = IpcCounter()
+    for _ in range(iterations):
+        context = await browser.new_context()
+        server = FixtureServer()
+        await server.install(context)
+        page = await context.new_page()
+        try:
+            tracemalloc.reset_peak()
+            counter.count = 0
+            wall_start = time.perf_counter()
+            cpu_start = time.process_time()
+            with counter.counting():
+                items = await stage(page)
+            samples["wall_time_s"].append(time.perf_counter() - wall_start)
+            samples["cpu_time_s"].append(time.process_time() - cpu_start)
+            samples["ipc_round_trips"].append(counter.count)
+            samples["bytes_served"].append(server.bytes_served)
+            samples["peak_memory_kib"].append(tracemalloc.get_traced_memory()[1] / 1024)
+            samples["items"].append(items)
+            samples["items_per_s"].append(items / samples["wall_time_s"][-1])
+        finally:
+            await context.close()
+    return {metric: statistics.median(values) for metric, values in samples.items()}
+
+async def run_benchmarks(stage_names, iterations: int) -> dict:
+    tracemalloc.start()
+    results = {}
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        try:
+            for name in stage_names:
+                logging.info(f"Benchmarking stage '{name}' ({iterations} iterations)")
+                results[name] = await run_stage(browser, STAGES[name], iterations)
+        finally:
+            await browser.close()
+    tracemalloc.stop()
+    return results
+
+def compare_to_baseline(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Return a description of every metric that is worse than the baseline by more than `tolerance`.
+    """
+    regressions = []
+    for stage, metrics in results.items():
+        for metric in METRICS:
+            base = baseline.get(stage, {}).get(metric)
+            if base is None:
+                continue
+            if metrics[metric] > base * (1 + tolerance):
+                regressions.append(f"{stage}.{metric}: {metrics[metric]:.4g} vs baseline {base:.4g}")
+    return regressions
+
+def print_results(results: dict):
+    header = f"{'stage':<16}" + "".join(f"{metric:>18}" for metric in REPORTED)
+    print(header)
+    for stage, metrics in results.items():
+        print(f"{stage:<16}" + "".join(f"{metrics[metric]:>18.4g}" for metric in REPORTED))
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the x.com scraper stages.")
+    parser.add_argument("--stages", default=",".join(STAGES), help="Comma separated stages to run.")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the baseline.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown before a metric counts as a regression.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    stage_names = [name.strip() for name in args.stages.split(",") if name.strip()]
+    unknown = [name for name in stage_names if name not in STAGES]
+    if unknown:
+        parser.error(f"Unknown stages: {', '.join(unknown)}. Choose from: {', '.join(STAGES)}")
+
+    results = asyncio.run(run_benchmarks(stage_names, args.iterations))
+    print_results(results)
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, "r") as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=4)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}. Run with --save-baseline to create one.")
+        return 0
+    with open(args.baseline, "r") as f:
+        baseline = json.load(f)
+    regressions = compare_to_baseline(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
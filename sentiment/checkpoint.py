@@ -0,0 +1,121 @@
+# checkpoint.py
+
+import os
+import json
+import time
+import logging
+from config import CHECKPOINT_PATH, CHECKPOINT_INTERVAL, CHECKPOINT_MAX_FAILURES, RUN_INTERVAL
+
+# Statuses after which a topic is not harvested again when a run is resumed.
+# "failed" becomes final too once a topic has failed CHECKPOINT_MAX_FAILURES times.
+FINAL_STATUSES = ("done", "timeout")
+
+class HarvestCheckpoint:
+    """
+    The progress of every topic in a harvest run (seen post IDs, post count and status),
+    saved periodically so a restarted run can continue where the failed one stopped instead
+    of scraping the trends and every topic again.
+    """
+
+    def __init__(self, topics: list, path: str = CHECKPOINT_PATH, interval: float = CHECKPOINT_INTERVAL,
+                 progress: dict = None, created_at: float = None, max_failures: int = CHECKPOINT_MAX_FAILURES):
+        self.path = path
+        self.interval = interval
+        self.max_failures = max_failures
+        self.topics = topics
+        self.progress = progress or {}
+        for topic in topics:
+            self.progress.setdefault(topic["name"], {"seen_ids": [], "count": 0, "status": "pending"})
+        self.created_at = created_at or time.time()  # Wall clock, compared across runs
+        self.last_save = time.monotonic()
+        self.status_changed = False
+
+    @classmethod
+    def load(cls, path: str = CHECKPOINT_PATH, max_age: float = RUN_INTERVAL):
+        """
+        Load the checkpoint of an unfinished run. Returns None when there is nothing to resume,
+        or when the checkpoint is older than `max_age` seconds and fresh trends should be scraped.
+        """
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            created_at = data.get("created_at") or os.path.getmtime(path)
+            checkpoint = cls(data["topics"], path=path, progress=data["progress"], created_at=created_at)
+        except (OSError, ValueError, KeyError) as e:
+            logging.warning(f"Ignoring unreadable checkpoint at {path}: {e}")
+            return None
+        if time.time() - checkpoint.created_at > max_age:
+            logging.info(f"Ignoring checkpoint at {path}, it is older than {max_age:.0f}s")
+            return None
+        if checkpoint.finished:
+            return None
+        logging.info(f"Resuming from checkpoint: {len(checkpoint.pending_topics())} of {len(checkpoint.topics)} topics left")
+        return checkpoint
+
+    def topic(self, name: str) -> dict:
+        return self.progress[name]
+
+    def pending_topics(self) -> list:
+        """
+        Return the topics that still need harvesting.
+        """
+        return [topic for topic in self.topics if not self._final(self.progress[topic["name"]])]
+
+    def _final(self, progress: dict) -> bool:
+        if progress["status"] == "failed":
+            return progress.get("failures", 0) >= self.max_failures
+        return progress["status"] in FINAL_STATUSES
+
+    @property
+    def finished(self) -> bool:
+        return not self.pending_topics()
+
+    def record_post(self, name: str, post_id: str):
+        """
+        Record a post as stored for the topic.
+        """
+        progress = self.progress[name]
+        progress["seen_ids"].append(post_id)
+        progress["count"] += 1
+        if progress["status"] == "pending":
+            progress["status"] = "in_progress"
+
+    def set_status(self, name: str, status: str):
+        """
+        Record a topic's status. It is saved by the caller's next save(), once the posts recorded
+        before it are stored, which `due` asks for right away.
+        """
+        progress = self.progress[name]
+        progress["status"] = status
+        if status == "failed":
+            progress["failures"] = progress.get("failures", 0) + 1
+        self.status_changed = True
+
+    @property
+    def due(self) -> bool:
+        """
+        True once `interval` seconds have passed since the last save, or a status has changed.
+        """
+        return self.status_changed or time.monotonic() - self.last_save >= self.interval
+
+    def save(self):
+        """
+        Write the checkpoint atomically, so a crash while saving never leaves a broken file.
+        """
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"topics": self.topics, "progress": self.progress, "created_at": self.created_at}, f, ensure_ascii=False)
+        os.replace(temp_path, self.path)
+        self.last_save = time.monotonic()
+        self.status_changed = False
+        logging.debug(f"Checkpoint saved to {self.path}")
+
+    def clear(self):
+        """
+        Remove the checkpoint once the run has finished.
+        """
+        if os.path.exists(self.path):
+            os.remove(self.path)
+            logging.info("Harvest finished. Checkpoint removed.")
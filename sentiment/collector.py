@@ -0,0 +1,89 @@
+# collector.py
+
+import logging
+from playwright.async_api import Page
+from config import SELECTORS
+
+# Builds a post record from a rendered post element
+POST_EXTRACTOR_JS = """
+(article, textSelector) => {
+    const time = article.querySelector('time');
+    const link = time ? time.closest('a[href*="/status/"]') : null;
+    const match = link ? link.getAttribute('href').match(/\\/([^/]+)\\/status\\/(\\d+)/) : null;
+    const text = article.querySelector(textSelector);
+    return {
+        id: match ? match[2] : null,
+        author: match ? match[1] : null,
+        text: text ? text.innerText : '',
+        created_at: time ? time.getAttribute('datetime') : null,
+    };
+}
+"""
+
+# Records every post already rendered and every post added later into an in-page buffer.
+# Posts are deduplicated in the page, so each one crosses over to Python once.
+COLLECTOR_JS = """
+({ selector, textSelector }) => {
+    if (window.__postCollector) {
+        return;
+    }
+    const extract = %s;
+    const buffer = [];
+    const seen = new Set();
+    const collect = article => {
+        const record = extract(article, textSelector);
+        if (record.id && !seen.has(record.id)) {
+            seen.add(record.id);
+            buffer.push(record);
+        }
+    };
+    const scan = node => {
+        if (node.nodeType !== Node.ELEMENT_NODE) {
+            return;
+        }
+        if (node.matches(selector)) {
+            collect(node);
+        } else {
+            node.querySelectorAll(selector).forEach(collect);
+        }
+    };
+    document.querySelectorAll(selector).forEach(collect);
+    const observer = new MutationObserver(mutations => {
+        for (const mutation of mutations) {
+            mutation.addedNodes.forEach(scan);
+        }
+    });
+    observer.observe(document.body, { childList: true, subtree: true });
+    window.__postCollector = { drain: () => buffer.splice(0, buffer.length), observer };
+}
+""" % POST_EXTRACTOR_JS.strip()
+
+DRAIN_JS = "() => window.__postCollector ? window.__postCollector.drain() : []"
+
+class PostCollector:
+    """
+    Collects posts as the timeline renders them, using a MutationObserver injected into the page,
+    instead of re-querying the whole timeline after each scroll. The buffered records are drained
+    in batches with a single evaluate call.
+    """
+
+    def __init__(self, page: Page, selector: str = SELECTORS["TWEET"], text_selector: str = SELECTORS["TWEET_TEXT"]):
+        self.page = page
+        self.selector = selector
+        self.text_selector = text_selector
+        self.drained = 0
+
+    async def install(self):
+        """
+        Inject the collector into the current document. Call again after a navigation.
+        """
+        await self.page.evaluate(COLLECTOR_JS, {"selector": self.selector, "textSelector": self.text_selector})
+        logging.debug("Post collector installed")
+
+    async def drain(self) -> list:
+        """
+        Return the posts collected since the last drain.
+        """
+        records = await self.page.evaluate(DRAIN_JS)
+        self.drained += len(records)
+        return records
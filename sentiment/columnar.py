@@ -0,0 +1,148 @@
+# columnar.py
+
+import os
+import glob
+import logging
+from datetime import datetime, timezone
+from sinks import Sink
+from config import COLUMNAR_FORMAT, COLUMNAR_ROW_GROUP_SIZE
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+except ImportError:  # Optional dependency, only needed for the columnar output
+    pa = None
+
+EXTENSIONS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("The columnar output needs pyarrow. Install it with: pip install pyarrow")
+
+def _dictionary():
+    # Low-cardinality strings are stored once per row group and referenced by index
+    return pa.dictionary(pa.int32(), pa.string())
+
+def post_schema():
+    _require_pyarrow()
+    return pa.schema([
+        ("id", pa.string()),
+        ("author", pa.string()),
+        ("text", pa.string()),
+        ("created_at", pa.timestamp("ms", tz="UTC")),
+        ("topic", _dictionary()),
+        ("scraped_at", pa.timestamp("us", tz="UTC")),
+    ])
+
+def topic_schema():
+    _require_pyarrow()
+    return pa.schema([
+        ("name", _dictionary()),
+        ("genre", _dictionary()),
+        ("post_count", pa.int64()),
+        ("rank", pa.int32()),
+        ("search_url", pa.string()),
+        ("source_tab", _dictionary()),
+        ("scraped_at", pa.timestamp("us", tz="UTC")),
+    ])
+
+def _convert(value, field):
+    """
+    Convert a scraped value (ISO timestamps and numbers read back from CSV are strings) to the
+    Python type of its column.
+    """
+    if value in (None, ""):
+        return None
+    if pa.types.is_timestamp(field.type) and isinstance(value, str):
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if pa.types.is_integer(field.type):
+        return int(value)
+    return value
+
+class ColumnarSink(Sink):
+    """
+    Writes records to a Parquet or Arrow IPC file with a fixed schema, one row group per
+    `row_group_size` records. The file is written next to `path` and moved into place on close.
+    """
+
+    def __init__(self, path: str, schema, file_format: str = COLUMNAR_FORMAT,
+                 row_group_size: int = COLUMNAR_ROW_GROUP_SIZE):
+        _require_pyarrow()
+        if file_format not in EXTENSIONS:
+            raise ValueError(f"Unknown columnar format: {file_format}")
+        self.name = os.path.basename(path)
+        self.path = path
+        self.temp_path = f"{path}.tmp"
+        self.schema = schema
+        self.file_format = file_format
+        self.row_group_size = row_group_size
+        self.batch = []
+        self.rows = 0
+        self.scraped_at = datetime.now(timezone.utc)  # For records without their own
+        # Dictionary columns share one growing dictionary across batches, so Arrow IPC files can
+        # append the new values of each batch as a delta instead of replacing the dictionary
+        self.dictionaries = {field.name: {} for field in schema if pa.types.is_dictionary(field.type)}
+        if file_format == "parquet":
+            self.writer = pq.ParquetWriter(self.temp_path, schema, compression="zstd")
+        else:
+            options = pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+            self.writer = pa.ipc.new_file(self.temp_path, schema, options=options)
+
+    async def write(self, record: dict):
+        self.batch.append(record)
+        self.rows += 1
+        if len(self.batch) >= self.row_group_size:
+            await self.flush()
+
+    def _column(self, field):
+        default = self.scraped_at if field.name == "scraped_at" else None
+        values = [_convert(record.get(field.name, default), field) for record in self.batch]
+        if field.name not in self.dictionaries:
+            return pa.array(values, type=field.type)
+        dictionary = self.dictionaries[field.name]
+        indices = [None if value is None else dictionary.setdefault(value, len(dictionary)) for value in values]
+        return pa.DictionaryArray.from_arrays(
+            pa.array(indices, type=field.type.index_type),
+            pa.array(list(dictionary), type=field.type.value_type),
+        )
+
+    async def flush(self):
+        if not self.batch:
+            return
+        columns = [self._column(field) for field in self.schema]
+        self.writer.write_table(pa.Table.from_arrays(columns, schema=self.schema))
+        self.batch.clear()
+
+    async def close(self, commit: bool = True):
+        await self.flush()
+        self.writer.close()
+        if commit:
+            os.replace(self.temp_path, self.path)
+            logging.info(f"Saved {self.rows} rows to {self.path}")
+        else:
+            logging.warning(f"Kept {self.rows} rows of an unfinished run in {self.temp_path}")
+
+def columnar_path(folder: str, name: str, file_format: str = COLUMNAR_FORMAT) -> str:
+    """
+    Path of a new output file, one per run, e.g. columnar/posts-20241130T120000.parquet.
+    """
+    os.makedirs(folder, exist_ok=True)
+    return os.path.join(folder, f"{name}-{datetime.now():%Y%m%dT%H%M%S}{EXTENSIONS[file_format]}")
+
+def read_columnar(path: str, columns: list = None):
+    """
+    Read a columnar file, or every run file of a kind with a glob such as "columnar/posts-*",
+    loading only `columns`. Files are memory-mapped; Arrow IPC columns are used without copying.
+    """
+    _require_pyarrow()
+    tables = []
+    for file_path in sorted(glob.glob(path)):
+        if file_path.endswith(EXTENSIONS["parquet"]):
+            tables.append(pq.read_table(file_path, columns=columns, memory_map=True))
+        elif file_path.endswith(EXTENSIONS["arrow"]):
+            table = pa.ipc.open_file(pa.memory_map(file_path)).read_all()
+            tables.append(table.select(columns) if columns else table)
+    if not tables:
+        raise FileNotFoundError(f"No columnar files match {path}")
+    return pa.concat_tables(tables, promote_options="permissive") if len(tables) > 1 else tables[0]
@@ -3,10 +3,51 @@
 import asyncio
 import logging
 from playwright.async_api import async_playwright
-from login import XComLoginScraper
-from scrape import XComScraper
-from helpers import create_screenshot_folder
-from config import SCREENSHOTS_DIR
+from login import XComLoginScraper, load_storage_state
+from scrape import XComScraper, POST_FIELDS
+from routing import ResourceBlocker
+from pool import PagePool, measure_throughput
+from scheduler import TopicScheduler
+from checkpoint import HarvestCheckpoint
+from dedup import PostIndex
+from trends import TrendHistory
+from sinks import FanOut, CsvSink, JsonlSink, SqliteSink
+from mongo import MongoSink
+from columnar import ColumnarSink, columnar_path, post_schema, topic_schema
+from helpers import create_screenshot_folder, start_screenshot_writer, stop_screenshot_writer, flight_recorder
+from config import (
+    SCREENSHOTS_DIR, COOKIES_PATH, SESSION_RESTORE, RESOURCE_BLOCKING,
+    PAGE_POOL_SIZE, POOL_BENCHMARK_SIZES, SCREENSHOT_BACKGROUND, POSTS_JSONL, POSTS_CSV,
+    TREND_REFRESH_ONLY_CHANGED, OUTPUT_SINKS, COLUMNAR_DIR, SQLITE_PATH,
+)
+
+def create_sinks(kind: str, resume: bool = False) -> list:
+    """
+    The sinks in OUTPUT_SINKS for "posts" or "topics". Topics always go to topics.csv as well,
+    through the trend stage, so the csv and jsonl sinks only apply to posts.
+    With `resume`, the posts CSV continues the file of the unfinished run being resumed.
+    """
+    sinks = []
+    for output in OUTPUT_SINKS:
+        if output == "jsonl" and kind == "posts":
+            sinks.append(JsonlSink(POSTS_JSONL))
+        elif output == "csv" and kind == "posts":
+            sinks.append(CsvSink(POSTS_CSV, POST_FIELDS, resume=resume))
+        elif output == "sqlite":
+            sinks.append(SqliteSink(SQLITE_PATH, kind))
+        elif output == "mongo":
+            sinks.append(MongoSink(kind, key="id" if kind == "posts" else None))
+        elif output == "columnar":
+            sinks.append(ColumnarSink(columnar_path(COLUMNAR_DIR, kind), post_schema() if kind == "posts" else topic_schema()))
+    return sinks
+
+def check_posts_stored(posts_sink: FanOut):
+    """
+    Stop the harvest once every posts sink has failed: nothing it scrapes would be stored, but the
+    post index and the checkpoint would still mark the posts as harvested.
+    """
+    if posts_sink.workers and len(posts_sink.errors) == len(posts_sink.workers):
+        raise posts_sink.errors[0]
 
 async def main():
     # Initialize logging
@@ -22,24 +63,114 @@ async def main():
     # Initialize screenshot folder
     folder_path = create_screenshot_folder(SCREENSHOTS_DIR)
 
+    # Capture and write screenshots off the scraping path
+    if SCREENSHOT_BACKGROUND:
+        start_screenshot_writer()
+
     async with async_playwright() as p:
         browser = await p.chromium.launch(headless=True)
-        context = await browser.new_context()
+        # Restore the saved session, if any, so the login flow can be skipped
+        storage_state = load_storage_state(COOKIES_PATH) if SESSION_RESTORE else None
+        context = await browser.new_context(storage_state=storage_state)
         page = await context.new_page()
 
+        # Abort images, media, fonts and tracking scripts we don't need
+        blocker = None
+        if RESOURCE_BLOCKING:
+            blocker = ResourceBlocker(context)
+            await blocker.install()
+
+        # Extra pages in the same logged-in context, for the explore tabs and the topic harvests
+        pool = PagePool(context, PAGE_POOL_SIZE)
+
+        failed = False
+        checkpoint = None
         try:
-            # Perform login
+            if blocker:
+                blocker.set_stage("login")
+
+            # Perform login, reusing the restored session when it is still valid
             login_scraper = XComLoginScraper(page)
             login_scraper.folder_path = folder_path  # Set the folder path for screenshots
-            await login_scraper.perform_login()
+            await login_scraper.ensure_logged_in()
 
-            # Perform scraping
+            # Perform scraping, remembering the trends seen by earlier runs to tell which ones are new
             scraper = XComScraper(page)
             scraper.folder_path = folder_path  # Set the folder path for screenshots
-            await scraper.perform_scraping()
+            history = TrendHistory()
+            previous_names = history.last_snapshot_names() or {topic["name"] for topic in scraper.load_topics()}
+
+            # Resume an unfinished run from its checkpoint instead of scraping the trends again
+            checkpoint = HarvestCheckpoint.load()
+            resuming = checkpoint is not None
+            if checkpoint is None:
+                if blocker:
+                    blocker.set_stage("trends")
+                if not await scraper.perform_scraping(pool, create_sinks("topics")):
+                    # topics.csv still holds the previous run's trends, don't record them as a new snapshot
+                    logging.warning("No topics were stored. Skipping the harvest.")
+                    return
+                topics = scraper.load_topics()
+
+                # Only harvest trends that are new or moved enough since the last snapshot
+                diff = history.refresh(topics)
+                history.save()
+                if TREND_REFRESH_ONLY_CHANGED:
+                    topics = diff["new"] + diff["changed"]
+                checkpoint = HarvestCheckpoint(topics)
+            else:
+                logging.info("Unfinished run found. Skipping the trend stage.")
+
+            if blocker:
+                blocker.set_stage("search")
+
+            # Process every topic's search page concurrently on pages sharing this context
+            topics = checkpoint.pending_topics()
+            if POOL_BENCHMARK_SIZES:
+                await measure_throughput(context, topics, scraper.visit_topic, POOL_BENCHMARK_SIZES)
+            else:
+                # Harvest posts from every topic, most valuable first, and store them as they arrive
+                scheduler = TopicScheduler(topics, previous_names)
+                index = PostIndex()  # Posts stored by earlier runs are skipped
+                # Posts are queued for every output sink; storage runs beside the harvest
+                posts_sink = FanOut(create_sinks("posts", resume=resuming))
+                completed = False
+                try:
+                    async for post in scraper.harvest(pool, scheduler, checkpoint, index):
+                        await posts_sink.write(post)
+                        check_posts_stored(posts_sink)
+                        index.add(post["id"])
+                        checkpoint.record_post(post["topic"], post["id"])
+                        # Only save the checkpoint once every post and status it records is stored
+                        if checkpoint.due:
+                            await posts_sink.flush()
+                            check_posts_stored(posts_sink)
+                            checkpoint.save()
+                    completed = True
+                finally:
+                    await posts_sink.close(commit=completed)
+                    index.close()
+                check_posts_stored(posts_sink)
+
+                if checkpoint.finished:
+                    checkpoint.clear()
+                else:
+                    checkpoint.save()
         except Exception as e:
             logging.error(f"An error occurred in the main process: {e}")
+            failed = True
+            if checkpoint:
+                checkpoint.save()  # Keep the progress so the next run can resume
         finally:
+            if blocker:
+                blocker.report()
+
+            # Flush pending screenshots while the pages are still open
+            await stop_screenshot_writer()
+            if failed:
+                await flight_recorder.flush_all(folder_path)
+            await pool.close()
+
             # Close browser
             await browser.close()
 
@@ -24,6 +24,10 @@ SELECTORS = {
     "password_input": 'input[autocomplete="current-password"]',
     "password_reveal_button": 'button[aria-label="Reveal password"]',  # Optional
     "login_button": 'button[data-testid="LoginForm_Login_Button"]',
+    "login_error": 'div[data-testid="toast"], div[role="alert"]',  # Error toast shown by the login flow
+    "home_link": 'a[data-testid="AppTabBar_Home_Link"]',  # Only rendered for logged-in sessions
+    "TWEET": 'article[data-testid="tweet"]',
+    "TWEET_TEXT": 'div[data-testid="tweetText"]',
     "TREND_CONTAINER": 'div[aria-label="Timeline: Explore"]',
     "TREND_ITEM": 'div[data-testid="trend"][role="link"]',
     "GENRE": 'div[aria-labelledby^="id__"] > div > div > div > span.css-1jxf684',  # Adjusted for genre
@@ -36,4 +40,141 @@ COOKIES_PATH = "cookies.json"
 SCREENSHOTS_DIR = os.path.join(os.getcwd(), "screenshots")
 LOG_FILE = "scraper.log"
 TOPICS_CSV = os.path.join(os.getcwd(), "topics.csv")
-TRENDING_URL = "https://x.com/explore/tabs/news"
+POSTS_JSONL = os.path.join(os.getcwd(), "posts.jsonl")
+CHECKPOINT_PATH = os.path.join(os.getcwd(), "harvest_checkpoint.json")
+CHECKPOINT_INTERVAL = 15  # Seconds between checkpoint saves while harvesting
+CHECKPOINT_MAX_FAILURES = 3  # Failed attempts after which a topic is given up on resume
+RUN_INTERVAL = float(os.getenv("X_RUN_INTERVAL", "3600"))  # Seconds between scheduled runs; older checkpoints are not resumed
+CSV_BATCH_SIZE = 50  # Rows buffered by a CsvSink between writes
+LOGIN_URL = "https://x.com/i/flow/login"
+HOME_URL = "https://x.com/home"
+SEARCH_URL = "https://x.com/search"
+EXPLORE_TAB_URL = "https://x.com/explore/tabs/{tab}"
+# Explore tabs scraped for trends, loaded concurrently and merged; the first tab wins for duplicates
+TRENDING_TABS = [tab.strip() for tab in os.getenv("X_TRENDING_TABS", "trending,news,sports,entertainment").split(",") if tab.strip()]
+if not TRENDING_TABS:
+    raise EnvironmentError("X_TRENDING_TABS must name at least one explore tab.")
+
+# Session restore: reuse the cookies saved by a previous login instead of logging in every run
+SESSION_RESTORE = os.getenv("X_SESSION_RESTORE", "true").lower() not in ("0", "false", "no")
+SESSION_CHECK_TIMEOUT = 10000  # ms to wait for the home timeline before falling back to a full login
+
+# Resource blocking: request types aborted in each stage, since we only need the text of the pages.
+# The pseudo type "tracking" matches any request whose URL contains one of BLOCKED_URL_PATTERNS.
+RESOURCE_BLOCKING = os.getenv("X_BLOCK_RESOURCES", "true").lower() not in ("0", "false", "no")
+BLOCKED_RESOURCES = {
+    "login": {"image", "media", "font", "tracking"},
+    "trends": {"image", "media", "font", "tracking"},
+    "search": {"image", "media", "font", "tracking"},
+}
+BLOCKED_URL_PATTERNS = [
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "ads-twitter.com",
+    "ads-api.x.com",
+    "analytics.twitter.com",
+    "/1.1/jot/",
+    "/i/api/1.1/jot/",
+]
+# Rough average transfer size per blocked type, used to estimate the bytes saved (aborted requests have no size)
+BLOCKED_BYTES_ESTIMATE = {
+    "image": 40 * 1024,
+    "media": 500 * 1024,
+    "font": 60 * 1024,
+    "tracking": 2 * 1024,
+}
+
+# Page pool: number of pages in the logged-in context that process topics concurrently
+PAGE_POOL_SIZE = int(os.getenv("X_PAGE_POOL_SIZE", "4"))
+# Optional comma separated pool sizes (e.g. "1,2,4,8") to compare throughput instead of a normal run
+POOL_BENCHMARK_SIZES = [int(size) for size in os.getenv("X_POOL_BENCHMARK_SIZES", "").split(",") if size.strip()]
+
+# Screenshot policy: "off" (nothing), "errors" (failures only), "sampled" (failures plus 1 in
+# SCREENSHOT_SAMPLE_RATE of the other steps), "recorder" (every step kept in memory, written to disk
+# only when an error screenshot is taken) or "all" (every step, handy while debugging selectors)
+SCREENSHOT_POLICY = os.getenv("X_SCREENSHOT_POLICY", "errors").lower()
+SCREENSHOT_SAMPLE_RATE = int(os.getenv("X_SCREENSHOT_SAMPLE_RATE", "10"))
+SCREENSHOT_FULL_PAGE = os.getenv("X_SCREENSHOT_FULL_PAGE", "false").lower() in ("1", "true", "yes")
+SCREENSHOT_FORMAT = os.getenv("X_SCREENSHOT_FORMAT", "jpeg").lower()  # "png" or "jpeg"
+SCREENSHOT_QUALITY = int(os.getenv("X_SCREENSHOT_QUALITY", "60"))  # JPEG only, 0-100
+FLIGHT_RECORDER_SIZE = int(os.getenv("X_FLIGHT_RECORDER_SIZE", "10"))  # Screenshots kept per page
+FLIGHT_RECORDER_QUALITY = int(os.getenv("X_FLIGHT_RECORDER_QUALITY", "40"))
+
+# Background screenshot writer: captures and disk writes happen off the scraping path
+SCREENSHOT_BACKGROUND = os.getenv("X_SCREENSHOT_BACKGROUND", "true").lower() not in ("0", "false", "no")
+SCREENSHOT_QUEUE_SIZE = int(os.getenv("X_SCREENSHOT_QUEUE_SIZE", "16"))
+SCREENSHOT_QUEUE_FULL = os.getenv("X_SCREENSHOT_QUEUE_FULL", "drop").lower()  # "drop" or "block"
+
+if SCREENSHOT_POLICY not in ("off", "errors", "sampled", "recorder", "all"):
+    raise EnvironmentError("X_SCREENSHOT_POLICY must be one of: off, errors, sampled, recorder, all.")
+if SCREENSHOT_FORMAT not in ("png", "jpeg"):
+    raise EnvironmentError("X_SCREENSHOT_FORMAT must be either png or jpeg.")
+if SCREENSHOT_QUEUE_FULL not in ("drop", "block"):
+    raise EnvironmentError("X_SCREENSHOT_QUEUE_FULL must be either drop or block.")
+
+# Harvest: posts collected from each topic's search timeline
+# "dom" reads posts from the rendered timeline, "network" parses the timeline API responses
+HARVEST_MODE = os.getenv("X_HARVEST_MODE", "network").lower()
+HARVEST_TARGET_PER_TOPIC = int(os.getenv("X_HARVEST_TARGET", "200"))
+HARVEST_TOPIC_DEADLINE = float(os.getenv("X_HARVEST_TOPIC_DEADLINE", "120"))  # Seconds per topic
+HARVEST_SCROLL_STEP = 2000  # Initial pixels scrolled between reads of the timeline
+HARVEST_SCROLL_MIN_STEP = 600
+HARVEST_SCROLL_MAX_STEP = 8000
+HARVEST_SCROLL_TARGET_NEW = 10  # New posts each scroll step should aim to reveal
+HARVEST_MAX_STAGNANT_SCROLLS = 3  # Consecutive scrolls without new posts before a topic is given up
+HARVEST_SCROLL_WAIT = 3000  # ms to wait for the timeline to load more posts after a scroll
+HARVEST_QUEUE_SIZE = 500  # Posts buffered between the pages and the consumer
+
+# Topic scheduling: topics are harvested in priority order under per-topic and whole-run time limits
+TOPIC_TIME_BUDGET = float(os.getenv("X_TOPIC_TIME_BUDGET", "180"))  # Hard limit per topic, in seconds
+RUN_DEADLINE = float(os.getenv("X_RUN_DEADLINE", "1800"))  # No topic starts after this many seconds
+TOPIC_PRIORITY_WEIGHTS = {
+    "volume": 1.0,  # Post count shown on the trend
+    "rank": 1.0,  # Position on the explore page
+    "novelty": 0.5,  # Not among the previous run's topics
+}
+
+if HARVEST_MODE not in ("dom", "network"):
+    raise EnvironmentError("X_HARVEST_MODE must be either dom or network.")
+
+# Cross-run dedup: Bloom filter of every harvested post ID, sized for DEDUP_CAPACITY posts
+DEDUP_INDEX_PATH = os.path.join(os.getcwd(), "post_index.bloom")
+DEDUP_CAPACITY = int(os.getenv("X_DEDUP_CAPACITY", "20000000"))
+DEDUP_FALSE_POSITIVE_RATE = float(os.getenv("X_DEDUP_FALSE_POSITIVE_RATE", "0.001"))
+
+# Trend history: every trend's first/last sighting and recent rank/post count, diffed on each refresh
+TREND_HISTORY_PATH = os.path.join(os.getcwd(), "trend_history.json")
+TREND_HISTORY_MAX_SNAPSHOTS = 48  # Snapshots kept per trend
+TREND_REFRESH_ONLY_CHANGED = os.getenv("X_TREND_REFRESH_ONLY_CHANGED", "true").lower() not in ("0", "false", "no")
+TREND_RANK_CHANGE = int(os.getenv("X_TREND_RANK_CHANGE", "3"))  # Places a trend must move to be harvested again
+TREND_VOLUME_CHANGE = float(os.getenv("X_TREND_VOLUME_CHANGE", "0.25"))  # Relative post count change, same purpose
+
+# SQLite backend: a local stand-in for MongoDB
+SQLITE_PATH = os.path.join(os.getcwd(), "scraper.db")
+SQLITE_BATCH_SIZE = 500  # Rows per SQLite transaction
+
+# MongoDB output (needs pymongo)
+MONGO_URI = os.getenv("X_MONGO_URI", "mongodb://localhost:27017")
+MONGO_DATABASE = os.getenv("X_MONGO_DATABASE", "sentiment")
+MONGO_BATCH_SIZE = 1000  # Records per bulk write
+MONGO_FLUSH_INTERVAL = 5.0  # Seconds a buffered record waits at most before it is written
+MONGO_MAX_PENDING_WRITES = 4  # Bulk writes in flight before writers have to wait
+
+# Columnar output: Parquet or Arrow IPC files, one per run (needs pyarrow)
+COLUMNAR_FORMAT = os.getenv("X_COLUMNAR_FORMAT", "parquet").lower()  # "parquet" or "arrow"
+COLUMNAR_DIR = os.path.join(os.getcwd(), "columnar")
+COLUMNAR_ROW_GROUP_SIZE = 10000  # Records per row group (Parquet) or record batch (Arrow)
+
+if COLUMNAR_FORMAT not in ("parquet", "arrow"):
+    raise EnvironmentError("X_COLUMNAR_FORMAT must be either parquet or arrow.")
+
+# Output sinks: every harvested post (and every trend, besides topics.csv) goes to each of these
+OUTPUT_SINKS = [sink.strip() for sink in os.getenv("X_OUTPUT_SINKS", "jsonl").lower().split(",") if sink.strip()]
+POSTS_CSV = os.path.join(os.getcwd(), "posts.csv")  # Replaced on every run, unlike posts.jsonl
+SINK_QUEUE_SIZE = 1000  # Records queued for the sinks before writers have to wait
+SINK_BUFFER_SIZE = 1000  # Records buffered per sink, so one slow sink doesn't hold up the others
+SINK_METRICS_INTERVAL = 30  # Seconds between sink lag reports
+
+if not set(OUTPUT_SINKS) <= {"csv", "jsonl", "sqlite", "mongo", "columnar"}:
+    raise EnvironmentError("X_OUTPUT_SINKS must be a comma separated list of: csv, jsonl, sqlite, mongo, columnar.")
@@ -0,0 +1,84 @@
+# dedup.py
+
+import os
+import math
+import mmap
+import struct
+import hashlib
+import logging
+from config import DEDUP_INDEX_PATH, DEDUP_CAPACITY, DEDUP_FALSE_POSITIVE_RATE
+
+HEADER = struct.Struct("<4sIQIQ")  # magic, version, bits, hash count, items added
+MAGIC = b"XPBF"
+VERSION = 1
+
+class PostIndex:
+    """
+    A persistent index of the post IDs harvested by previous runs, so posts that keep coming back
+    with recurring trends are not parsed and stored again.
+    It is a Bloom filter in a memory-mapped file: the file size is fixed by `capacity` and
+    `false_positive_rate`, and memory use stays flat however many IDs are added, because only the
+    pages the OS touches are resident. A false positive skips a post that was never stored; there
+    are no false negatives.
+    """
+
+    def __init__(self, path: str = DEDUP_INDEX_PATH, capacity: int = DEDUP_CAPACITY,
+                 false_positive_rate: float = DEDUP_FALSE_POSITIVE_RATE):
+        self.path = path
+        bits = math.ceil(-capacity * math.log(false_positive_rate) / math.log(2) ** 2)
+        self.bits = math.ceil(bits / 8) * 8
+        self.hashes = max(1, round(self.bits / capacity * math.log(2)))
+        self.count = 0
+
+        if os.path.exists(path):
+            self._file = open(path, "r+b")
+            magic, version, bits, hashes, count = HEADER.unpack(self._file.read(HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                self._file.close()
+                raise ValueError(f"{path} is not a post index.")
+            if (bits, hashes) != (self.bits, self.hashes):
+                logging.warning(f"Post index {path} was created with other settings. Keeping its {bits} bits and {hashes} hashes.")
+            self.bits, self.hashes, self.count = bits, hashes, count
+        else:
+            self._file = open(path, "w+b")
+            self._file.write(HEADER.pack(MAGIC, VERSION, self.bits, self.hashes, 0))
+            self._file.truncate(HEADER.size + self.bits // 8)
+            logging.info(f"Created post index {path} ({(self.bits // 8) / 1024 ** 2:.1f} MiB, {self.hashes} hashes)")
+        self._map = mmap.mmap(self._file.fileno(), HEADER.size + self.bits // 8)
+
+    def _positions(self, post_id: str):
+        digest = hashlib.blake2b(post_id.encode(), digest_size=16).digest()
+        first, second = struct.unpack("<QQ", digest)
+        for i in range(self.hashes):
+            yield (first + i * second) % self.bits
+
+    def __contains__(self, post_id: str) -> bool:
+        return all(
+            self._map[HEADER.size + position // 8] & (1 << (position % 8))
+            for position in self._positions(post_id)
+        )
+
+    def add(self, post_id: str) -> bool:
+        """
+        Add a post ID. Returns False if it (probably) was already in the index.
+        """
+        added = False
+        for position in self._positions(post_id):
+            offset = HEADER.size + position // 8
+            mask = 1 << (position % 8)
+            if not self._map[offset] & mask:
+                self._map[offset] |= mask
+                added = True
+        if added:
+            self.count += 1
+        return added
+
+    def flush(self):
+        self._map[:HEADER.size] = HEADER.pack(MAGIC, VERSION, self.bits, self.hashes, self.count)
+        self._map.flush()
+
+    def close(self):
+        self.flush()
+        self._map.close()
+        self._file.close()
+        logging.info(f"Post index closed with about {self.count} posts")
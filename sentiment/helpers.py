@@ -1,22 +1,236 @@
 # helpers.py
 
 import os
+import asyncio
 import logging
+from collections import deque
 from datetime import datetime
 from playwright.async_api import Page
+from config import (
+    SCREENSHOT_POLICY, SCREENSHOT_SAMPLE_RATE, SCREENSHOT_FULL_PAGE,
+    SCREENSHOT_FORMAT, SCREENSHOT_QUALITY, SCREENSHOT_QUEUE_SIZE, SCREENSHOT_QUEUE_FULL,
+    FLIGHT_RECORDER_SIZE, FLIGHT_RECORDER_QUALITY,
+)
 
-async def take_screenshot(page: Page, step_name: str, folder_path: str):
+_screenshot_requests = 0  # Non-error screenshot requests seen so far, for sampling
+_screenshot_writer = None  # Background writer, when one has been started
+
+def should_take_screenshot(error: bool = False) -> bool:
+    """
+    Decide whether a screenshot should be captured under the configured SCREENSHOT_POLICY.
+    Error screenshots are kept by every policy except "off".
+    """
+    global _screenshot_requests
+    if SCREENSHOT_POLICY == "off":
+        return False
+    if error or SCREENSHOT_POLICY in ("all", "recorder"):
+        return True
+    if SCREENSHOT_POLICY == "sampled":
+        _screenshot_requests += 1
+        return (_screenshot_requests - 1) % max(SCREENSHOT_SAMPLE_RATE, 1) == 0
+    return False
+
+def screenshot_options() -> dict:
+    """
+    Return the page.screenshot keyword arguments for the configured format, quality and capture area.
+    """
+    options = {"full_page": SCREENSHOT_FULL_PAGE, "type": SCREENSHOT_FORMAT}
+    if SCREENSHOT_FORMAT == "jpeg":
+        options["quality"] = SCREENSHOT_QUALITY
+    return options
+
+async def take_screenshot(page: Page, step_name: str, folder_path: str, error: bool = False):
     """
     Take a screenshot and save it to the specified folder with a descriptive name.
-    Ensures that the screenshot captures the full page content.
+    Whether anything is captured, and how, follows the screenshot policy in config.py.
+    Pass error=True from failure paths so the capture is kept by the "errors" policy.
+    Under the "recorder" policy, successful steps are only kept in memory by the flight
+    recorder and are written out together with the next error screenshot of the same page.
     """
+    if not should_take_screenshot(error):
+        return
     try:
-        filename = os.path.join(folder_path, f"{step_name}.png")
-        await page.screenshot(path=filename, full_page=True)
-        logging.info(f"Screenshot saved: {filename}")
+        extension = "jpg" if SCREENSHOT_FORMAT == "jpeg" else "png"
+        filename = os.path.join(folder_path, f"{step_name}.{extension}")
+        if error:
+            # Capture now and only queue the writes: a failed page goes straight back to the pool,
+            # so a capture taken later could show the next topic instead of the failure
+            recorded = []
+            if SCREENSHOT_POLICY == "recorder":
+                if _screenshot_writer is not None:
+                    await _screenshot_writer.flush()  # Let queued recorder captures reach the buffer
+                recorded = flight_recorder.take(page)
+            data = await _capture(page, filename, screenshot_options())
+
+            async def job():
+                await flight_recorder.write(recorded, folder_path)
+                if data is not None:
+                    await _save(filename, data)
+        elif SCREENSHOT_POLICY == "recorder":
+            job = lambda: flight_recorder.capture(page, step_name)
+        else:
+            job = lambda: _capture_to_file(page, filename, screenshot_options())
+
+        if _screenshot_writer is not None:
+            # Never drop a capture that flushes the flight recorder
+            await _screenshot_writer.submit(job, filename, block=error)
+        else:
+            await job()
     except Exception as e:
         logging.error(f"Failed to take screenshot for '{step_name}': {e}")
 
+def _write_file(filename: str, data: bytes):
+    with open(filename, "wb") as f:
+        f.write(data)
+
+async def _capture(page: Page, filename: str, options: dict):
+    if page.is_closed():
+        logging.warning(f"Page closed before screenshot could be taken: {filename}")
+        return None
+    return await page.screenshot(**options)
+
+async def _save(filename: str, data: bytes):
+    await asyncio.to_thread(_write_file, filename, data)
+    logging.info(f"Screenshot saved: {filename}")
+
+async def _capture_to_file(page: Page, filename: str, options: dict):
+    data = await _capture(page, filename, options)
+    if data is not None:
+        await _save(filename, data)
+
+class FlightRecorder:
+    """
+    Keeps the last `size` screenshots of each page in memory as low quality JPEGs,
+    so they can be written to disk only when something goes wrong.
+    """
+
+    def __init__(self, size: int = FLIGHT_RECORDER_SIZE, quality: int = FLIGHT_RECORDER_QUALITY):
+        self.size = size
+        self.quality = quality
+        self.buffers = {}  # page -> deque of (timestamp, step name, jpeg bytes)
+
+    async def capture(self, page: Page, step_name: str):
+        """
+        Capture the viewport of the page into its ring buffer.
+        """
+        if page.is_closed():
+            return
+        data = await page.screenshot(type="jpeg", quality=self.quality, full_page=False)
+        if page not in self.buffers:
+            self.buffers[page] = deque(maxlen=self.size)
+            page.once("close", lambda closed_page: self.buffers.pop(closed_page, None))
+        self.buffers[page].append((datetime.now(), step_name, data))
+        logging.debug(f"Flight recorder captured '{step_name}'")
+
+    def take(self, page: Page) -> list:
+        """
+        Remove and return the recorded screenshots of the page.
+        """
+        return list(self.buffers.pop(page, ()))
+
+    async def flush(self, page: Page, folder_path: str):
+        """
+        Write the recorded screenshots of the page to the folder and clear its buffer.
+        """
+        await self.write(self.take(page), folder_path)
+
+    async def write(self, entries: list, folder_path: str):
+        if not entries:
+            return
+        for timestamp, step_name, data in entries:
+            filename = os.path.join(folder_path, f"recorded_{timestamp.strftime('%H%M%S_%f')}_{step_name}.jpg")
+            await asyncio.to_thread(_write_file, filename, data)
+        logging.info(f"Flight recorder wrote {len(entries)} screenshots to '{folder_path}/'")
+
+    async def flush_all(self, folder_path: str):
+        """
+        Write the recorded screenshots of every page, e.g. when the main process fails.
+        """
+        for page in list(self.buffers):
+            await self.flush(page, folder_path)
+
+flight_recorder = FlightRecorder()
+
+class ScreenshotWriter:
+    """
+    Captures screenshots and writes them to disk from a background task, so the scraping
+    code only waits for the request to be queued. A capture reflects the page a moment after
+    it was requested; error screenshots are captured by take_screenshot itself and only
+    written here. When the queue is full, requests are dropped or the caller blocks,
+    depending on `when_full`.
+    """
+
+    def __init__(self, max_queue: int = SCREENSHOT_QUEUE_SIZE, when_full: str = SCREENSHOT_QUEUE_FULL):
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.when_full = when_full
+        self.task = None
+        self.written = 0
+        self.dropped = 0
+
+    def start(self):
+        self.task = asyncio.create_task(self._run())
+
+    async def submit(self, job, description: str, block: bool = False):
+        """
+        Queue `job`, an async callable that captures and stores a screenshot.
+        Pass block=True to wait for room in the queue regardless of the drop policy.
+        """
+        if block or self.when_full == "block":
+            await self.queue.put((job, description))
+            return
+        try:
+            self.queue.put_nowait((job, description))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logging.warning(f"Screenshot queue full. Dropped screenshot: {description}")
+
+    async def _run(self):
+        while True:
+            job, description = await self.queue.get()
+            try:
+                await job()
+                self.written += 1
+            except Exception as e:
+                logging.error(f"Failed to take screenshot '{description}': {e}")
+            finally:
+                self.queue.task_done()
+
+    async def flush(self):
+        """
+        Wait until every queued screenshot has been captured and written.
+        """
+        await self.queue.join()
+
+    async def close(self):
+        """
+        Flush the queue and stop the background task.
+        """
+        await self.flush()
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+        logging.info(f"Screenshot writer closed: {self.written} processed, {self.dropped} dropped.")
+
+def start_screenshot_writer(**kwargs) -> ScreenshotWriter:
+    """
+    Start a background writer and route every take_screenshot call through it.
+    """
+    global _screenshot_writer
+    _screenshot_writer = ScreenshotWriter(**kwargs)
+    _screenshot_writer.start()
+    return _screenshot_writer
+
+async def stop_screenshot_writer():
+    """
+    Flush and stop the background writer. Must run before the browser is closed.
+    """
+    global _screenshot_writer
+    if _screenshot_writer is None:
+        return
+    writer, _screenshot_writer = _screenshot_writer, None
+    await writer.close()
+
 def create_screenshot_folder(screenshots_dir: str) -> str:
     """
     Create a new folder within the screenshots directory named with the current timestamp.
@@ -2,10 +2,53 @@
 
 import os
 import json
+import time
 import logging
 from playwright.async_api import TimeoutError as PlaywrightTimeoutError
-from config import SELECTORS, X_USERNAME, X_PASSWORD, X_EMAIL, COOKIES_PATH
+from config import (
+    SELECTORS, X_USERNAME, X_PASSWORD, X_EMAIL, COOKIES_PATH,
+    LOGIN_URL, HOME_URL, SESSION_CHECK_TIMEOUT,
+)
 from helpers import take_screenshot
+from readiness import SelectorSignal, ResponseSignal, PredicateSignal, wait_until_ready
+
+SESSION_COOKIE = "auth_token"  # Cookie x.com sets only for authenticated sessions
+
+def load_storage_state(cookies_path: str = COOKIES_PATH):
+    """
+    Load the cookies written by XComLoginScraper.save_cookies and convert them into a
+    Playwright storage state for browser.new_context.
+    Returns None when there is no saved session worth restoring.
+    """
+    if not os.path.exists(cookies_path):
+        logging.info(f"No saved session found at '{cookies_path}'.")
+        return None
+    try:
+        with open(cookies_path, "r") as f:
+            cookies = json.load(f)
+    except (OSError, ValueError) as e:
+        logging.warning(f"Failed to read saved session from '{cookies_path}': {e}")
+        return None
+
+    now = time.time()
+    restored = []
+    for cookie in cookies:
+        expires = cookie.get("expires")
+        if expires is None:
+            expires = -1  # Playwright's marker for session cookies
+        elif expires != -1 and expires < now:
+            continue  # Skip cookies that have already expired
+        restored.append({
+            **cookie,
+            "expires": expires,
+            "sameSite": cookie.get("sameSite") if cookie.get("sameSite") in ("Strict", "Lax", "None") else "Lax",
+        })
+
+    if not any(cookie["name"] == SESSION_COOKIE for cookie in restored):
+        logging.info("Saved session has no valid auth cookie. A full login is required.")
+        return None
+    logging.info(f"Loaded {len(restored)} cookies from '{cookies_path}'.")
+    return {"cookies": restored, "origins": []}
 
 class XComLoginScraper:
     """
@@ -13,6 +56,32 @@ class XComLoginScraper:
     It accommodates different authentication scenarios based on the presence of email verification.
     """
 
+    # Signals that tell each step the page is ready, whichever fires first
+    READY_SIGNALS = {
+        "login_page": (
+            SelectorSignal(SELECTORS["username_input"], name="username_input"),
+        ),
+        # The screen after 'Next' depends on the account, so race every screen it can lead to
+        "after_username": (
+            SelectorSignal(SELECTORS["email_input"], name="email_input"),
+            SelectorSignal(SELECTORS["password_input"], name="password_input"),
+            SelectorSignal(SELECTORS["login_error"], name="login_error"),
+        ),
+        "after_email": (
+            SelectorSignal(SELECTORS["password_input"], name="password_input"),
+            SelectorSignal(SELECTORS["login_error"], name="login_error"),
+        ),
+        "session_check": (
+            SelectorSignal(SELECTORS["home_link"], name="home_link"),
+            PredicateSignal("() => location.pathname.includes('/login')", name="login_redirect"),
+        ),
+        "after_login": (
+            SelectorSignal(SELECTORS["home_link"], name="home_link"),
+            PredicateSignal("() => location.pathname.startsWith('/home')", name="home_url"),
+            ResponseSignal(r"/i/api/graphql/[^/]+/HomeTimeline", name="home_timeline_response"),
+        ),
+    }
+
     def __init__(self, page):
         self.page = page
         self.context = self.page.context
@@ -20,6 +89,7 @@ class XComLoginScraper:
         self.selectors = SELECTORS
         self.cookies_path = COOKIES_PATH
         self.folder_path = None  # To be set externally
+        self.next_screen = None  # Name of the signal that fired after the last 'Next' click
 
     async def navigate_to_login_page(self):
         """
@@ -27,12 +97,18 @@ class XComLoginScraper:
         """
         logging.info("Navigating to login page...")
         try:
-            await self.page.goto("https://x.com/i/flow/login", wait_until="networkidle")
+            await wait_until_ready(
+                self.page,
+                self.READY_SIGNALS["login_page"],
+                timeout=30000,
+                action=lambda: self.page.goto(LOGIN_URL, wait_until="commit"),
+                step="login_page",
+            )
             await take_screenshot(self.page, "login_page", self.folder_path)
             logging.info("Login page loaded successfully.")
         except Exception as e:
             logging.error(f"Failed to navigate to login page: {e}")
-            await take_screenshot(self.page, "login_page_error", self.folder_path)
+            await take_screenshot(self.page, "login_page_error", self.folder_path, error=True)
             raise
 
     async def enter_username(self):
@@ -49,18 +125,36 @@ class XComLoginScraper:
             entered_username = await self.page.input_value(self.selectors["username_input"])
             if entered_username != X_USERNAME:
                 logging.error("Username was not entered correctly.")
-                await take_screenshot(self.page, "username_verification_failed", self.folder_path)
+                await take_screenshot(self.page, "username_verification_failed", self.folder_path, error=True)
                 raise ValueError("Username verification failed.")
             logging.info("Username entered and verified successfully.")
         except PlaywrightTimeoutError:
             logging.error(f"Username input field '{self.selectors['username_input']}' not found.")
-            await take_screenshot(self.page, "username_input_not_found", self.folder_path)
+            await take_screenshot(self.page, "username_input_not_found", self.folder_path, error=True)
             raise
         except Exception as e:
             logging.error(f"Error entering username: {e}")
-            await take_screenshot(self.page, "username_entry_error", self.folder_path)
+            await take_screenshot(self.page, "username_entry_error", self.folder_path, error=True)
             raise
 
+    async def wait_for_next_screen(self, step: str, button_selector: str):
+        """
+        Click a 'Next' button and continue as soon as one of the screens it can lead to appears.
+        Records the screen in self.next_screen and raises ValueError if the login flow shows an error.
+        """
+        signal = await wait_until_ready(
+            self.page,
+            self.READY_SIGNALS[step],
+            timeout=15000,
+            action=lambda: self.page.click(button_selector),
+            step=step,
+        )
+        self.next_screen = signal.name
+        logging.info(f"Login flow moved to '{self.next_screen}'.")
+        if self.next_screen == "login_error":
+            error_text = await self.page.inner_text(self.selectors["login_error"])
+            raise ValueError(f"Login flow reported an error: {error_text.strip()}")
+
     async def click_next_after_username(self):
         """
         Click the 'Next' button after entering the username.
@@ -68,28 +162,31 @@ class XComLoginScraper:
         logging.info("Clicking 'Next' button after username...")
         try:
             await self.page.wait_for_selector(self.selectors["username_next_button"], timeout=15000)
-            await self.page.click(self.selectors["username_next_button"])
-            await self.page.wait_for_timeout(3000)  # Wait for transition
+            await self.wait_for_next_screen("after_username", self.selectors["username_next_button"])
             await take_screenshot(self.page, "after_username_next_click", self.folder_path)
             logging.info("'Next' button clicked successfully after username.")
         except PlaywrightTimeoutError:
             logging.error(f"'Next' button '{self.selectors['username_next_button']}' not found or not clickable after username.")
-            await take_screenshot(self.page, "next_button_after_username_not_found", self.folder_path)
+            await take_screenshot(self.page, "next_button_after_username_not_found", self.folder_path, error=True)
             raise
         except Exception as e:
             logging.error(f"Error clicking 'Next' button after username: {e}")
-            await take_screenshot(self.page, "next_button_after_username_click_error", self.folder_path)
+            await take_screenshot(self.page, "next_button_after_username_click_error", self.folder_path, error=True)
             raise
 
     async def is_email_authentication_required(self) -> bool:
         """
-        Determine whether email authentication is required by checking the presence of the email input field.
+        Determine whether email authentication is required, based on the screen that appeared after
+        the username 'Next' click, or by checking for the email input field if that is unknown.
         Returns True if email authentication is required, False otherwise.
         """
         logging.info("Determining if email authentication is required...")
         try:
-            email_input = await self.page.query_selector(self.selectors["email_input"])
-            if email_input:
+            if self.next_screen is not None:
+                email_required = self.next_screen == "email_input"
+            else:
+                email_required = await self.page.query_selector(self.selectors["email_input"]) is not None
+            if email_required:
                 logging.info("Email authentication is required.")
                 return True
             else:
@@ -97,7 +194,7 @@ class XComLoginScraper:
                 return False
         except Exception as e:
             logging.error(f"Error determining authentication flow: {e}")
-            await take_screenshot(self.page, "authentication_flow_error", self.folder_path)
+            await take_screenshot(self.page, "authentication_flow_error", self.folder_path, error=True)
             raise
 
     async def enter_email(self):
@@ -118,16 +215,16 @@ class XComLoginScraper:
             entered_email = await self.page.input_value(self.selectors["email_input"])
             if entered_email != X_EMAIL:
                 logging.error("Email was not entered correctly.")
-                await take_screenshot(self.page, "email_verification_failed", self.folder_path)
+                await take_screenshot(self.page, "email_verification_failed", self.folder_path, error=True)
                 raise ValueError("Email verification failed.")
             logging.info("Email entered and verified successfully.")
         except PlaywrightTimeoutError:
             logging.error(f"Email input field '{self.selectors['email_input']}' not found.")
-            await take_screenshot(self.page, "email_input_not_found", self.folder_path)
+            await take_screenshot(self.page, "email_input_not_found", self.folder_path, error=True)
             raise
         except Exception as e:
             logging.error(f"Error entering email: {e}")
-            await take_screenshot(self.page, "email_entry_error", self.folder_path)
+            await take_screenshot(self.page, "email_entry_error", self.folder_path, error=True)
             raise
 
     async def click_next_after_email(self):
@@ -137,17 +234,16 @@ class XComLoginScraper:
         logging.info("Clicking 'Next' button after email...")
         try:
             await self.page.wait_for_selector(self.selectors["email_next_button"], timeout=15000)
-            await self.page.click(self.selectors["email_next_button"])
-            await self.page.wait_for_timeout(3000)  # Wait for transition
+            await self.wait_for_next_screen("after_email", self.selectors["email_next_button"])
             await take_screenshot(self.page, "after_email_next_click", self.folder_path)
             logging.info("'Next' button clicked successfully after email.")
         except PlaywrightTimeoutError:
             logging.error(f"'Next' button '{self.selectors['email_next_button']}' not found or not clickable after email.")
-            await take_screenshot(self.page, "next_button_after_email_not_found", self.folder_path)
+            await take_screenshot(self.page, "next_button_after_email_not_found", self.folder_path, error=True)
             raise
         except Exception as e:
             logging.error(f"Error clicking 'Next' button after email: {e}")
-            await take_screenshot(self.page, "next_button_after_email_click_error", self.folder_path)
+            await take_screenshot(self.page, "next_button_after_email_click_error", self.folder_path, error=True)
             raise
 
     async def enter_password(self):
@@ -162,11 +258,11 @@ class XComLoginScraper:
             logging.info("Password entered successfully.")
         except PlaywrightTimeoutError:
             logging.error(f"Password input field '{self.selectors['password_input']}' not found.")
-            await take_screenshot(self.page, "password_input_not_found", self.folder_path)
+            await take_screenshot(self.page, "password_input_not_found", self.folder_path, error=True)
             raise
         except Exception as e:
             logging.error(f"Error entering password: {e}")
-            await take_screenshot(self.page, "password_entry_error", self.folder_path)
+            await take_screenshot(self.page, "password_entry_error", self.folder_path, error=True)
             raise
 
     async def ensure_login_button_enabled(self):
@@ -179,16 +275,16 @@ class XComLoginScraper:
             is_enabled = await self.page.is_enabled(self.selectors["login_button"])
             if not is_enabled:
                 logging.error("'Log in' button is disabled. Password may be incorrect or not properly entered.")
-                await take_screenshot(self.page, "login_button_disabled", self.folder_path)
+                await take_screenshot(self.page, "login_button_disabled", self.folder_path, error=True)
                 raise ValueError("'Log in' button is disabled.")
             logging.info("'Log in' button is enabled.")
         except PlaywrightTimeoutError:
             logging.error(f"'Log in' button '{self.selectors['login_button']}' not found.")
-            await take_screenshot(self.page, "login_button_not_found", self.folder_path)
+            await take_screenshot(self.page, "login_button_not_found", self.folder_path, error=True)
             raise
         except Exception as e:
             logging.error(f"Error checking 'Log in' button state: {e}")
-            await take_screenshot(self.page, "login_button_state_error", self.folder_path)
+            await take_screenshot(self.page, "login_button_state_error", self.folder_path, error=True)
             raise
 
     async def click_login_button(self):
@@ -197,17 +293,22 @@ class XComLoginScraper:
         """
         logging.info("Clicking 'Log in' button...")
         try:
-            await self.page.click(self.selectors["login_button"])
-            await self.page.wait_for_load_state("networkidle")
+            await wait_until_ready(
+                self.page,
+                self.READY_SIGNALS["after_login"],
+                timeout=30000,
+                action=lambda: self.page.click(self.selectors["login_button"]),
+                step="after_login",
+            )
             await take_screenshot(self.page, "after_login_click", self.folder_path)
             logging.info("'Log in' button clicked successfully.")
         except PlaywrightTimeoutError:
             logging.error(f"'Log in' button '{self.selectors['login_button']}' not found or not clickable.")
-            await take_screenshot(self.page, "login_button_not_clickable", self.folder_path)
+            await take_screenshot(self.page, "login_button_not_clickable", self.folder_path, error=True)
             raise
         except Exception as e:
             logging.error(f"Error clicking 'Log in' button: {e}")
-            await take_screenshot(self.page, "login_button_click_error", self.folder_path)
+            await take_screenshot(self.page, "login_button_click_error", self.folder_path, error=True)
             raise
 
     async def save_cookies(self):
@@ -234,9 +335,53 @@ class XComLoginScraper:
             await take_screenshot(self.page, "logged_in_successfully", self.folder_path)
         except Exception as e:
             logging.error(f"Failed to save cookies: {e}")
-            await take_screenshot(self.page, "save_cookies_error", self.folder_path)
+            await take_screenshot(self.page, "save_cookies_error", self.folder_path, error=True)
             raise
 
+    async def is_session_valid(self) -> bool:
+        """
+        Cheaply check whether the context already holds a logged-in session.
+        Looks for the auth cookie first and only then loads the home timeline, which
+        redirects to the login flow when the session has expired.
+        """
+        logging.info("Checking for a restorable session...")
+        cookies = await self.context.cookies("https://x.com")
+        if not any(cookie["name"] == SESSION_COOKIE for cookie in cookies):
+            logging.info("No auth cookie in the browser context.")
+            return False
+        try:
+            signal = await wait_until_ready(
+                self.page,
+                self.READY_SIGNALS["session_check"],
+                timeout=SESSION_CHECK_TIMEOUT,
+                action=lambda: self.page.goto(HOME_URL, wait_until="commit"),
+                step="session_check",
+            )
+            if signal.name == "login_redirect":
+                logging.info("Saved session was rejected. Redirected to the login flow.")
+                return False
+            logging.info("Saved session is still valid.")
+            return True
+        except PlaywrightTimeoutError:
+            logging.info("Home timeline did not load with the saved session.")
+            await take_screenshot(self.page, "session_check_timeout", self.folder_path, error=True)
+            return False
+        except Exception as e:
+            logging.warning(f"Error while checking the saved session: {e}")
+            await take_screenshot(self.page, "session_check_error", self.folder_path, error=True)
+            return False
+
+    async def ensure_logged_in(self):
+        """
+        Reuse the session restored into the browser context when it is still valid,
+        otherwise fall back to the complete login process.
+        """
+        if await self.is_session_valid():
+            logging.info("Session restored. Skipping login.")
+            return
+        await self.context.clear_cookies()  # Drop the stale session before logging in again
+        await self.perform_login()
+
     async def perform_login(self):
         """
         Execute the complete login process, handling different authentication flows.
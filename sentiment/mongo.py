@@ -0,0 +1,128 @@
+# mongo.py
+
+import asyncio
+import logging
+from sinks import Sink
+from config import MONGO_URI, MONGO_DATABASE, MONGO_BATCH_SIZE, MONGO_FLUSH_INTERVAL, MONGO_MAX_PENDING_WRITES
+
+try:
+    from pymongo import MongoClient, InsertOne, UpdateOne
+    from pymongo.errors import BulkWriteError
+except ImportError:  # Optional dependency, only needed for the MongoDB output
+    MongoClient = None
+
+class MongoSink(Sink):
+    """
+    Writes records to a MongoDB collection with unordered bulk writes instead of one request per
+    document. A bulk write starts once `batch_size` records are buffered or `flush_interval`
+    seconds after the first buffered one, and runs on a worker thread. When `max_pending` bulk
+    writes are in flight, write() waits, which slows the harvest down to what the database takes.
+    The first failed bulk write, even a partly failed one, is raised by the next write() or flush().
+
+    With `key` set, records are upserted on that field (as _id), so a post harvested twice is
+    stored once; without it every record is inserted. Pass `collection` to write to an existing
+    collection object, e.g. an in-process mock with a bulk_write(requests, ordered) method.
+    """
+
+    def __init__(self, collection_name: str, key: str = None, collection=None, uri: str = MONGO_URI,
+                 database: str = MONGO_DATABASE, batch_size: int = MONGO_BATCH_SIZE,
+                 flush_interval: float = MONGO_FLUSH_INTERVAL, max_pending: int = MONGO_MAX_PENDING_WRITES):
+        if MongoClient is None:
+            raise ImportError("The MongoDB output needs pymongo. Install it with: pip install pymongo")
+        self.client = None
+        if collection is None:
+            self.client = MongoClient(uri)
+            collection = self.client[database][collection_name]
+        self.collection = collection
+        self.name = f"mongodb:{collection_name}"
+        self.key = key
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.pending = asyncio.Semaphore(max_pending)
+        self.batch = []
+        self.writes = set()
+        self.timer = None
+        self.written = 0
+        self.failed = 0
+        self.error = None  # First failed bulk write, raised by write() and flush()
+
+    def _request(self, record: dict):
+        if self.key is None:
+            return InsertOne(dict(record))
+        return UpdateOne({"_id": record[self.key]}, {"$set": record}, upsert=True)
+
+    def _raise_error(self):
+        if self.error is not None:
+            raise self.error
+
+    async def write(self, record: dict):
+        self._raise_error()
+        self.batch.append(self._request(record))
+        if len(self.batch) >= self.batch_size:
+            await self._start_write()
+        elif self.timer is None:
+            self.timer = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        try:
+            await asyncio.sleep(self.flush_interval)
+            await self._start_write()
+        finally:
+            if self.timer is asyncio.current_task():
+                self.timer = None
+
+    async def _start_write(self):
+        """
+        Hand the buffered requests to a bulk write, waiting while `max_pending` are in flight.
+        The batch is only taken once a slot is free, so a timer still waiting for one holds no
+        records and flush() can cancel it.
+        """
+        if self.timer and self.timer is not asyncio.current_task():
+            self.timer.cancel()
+            self.timer = None
+        if not self.batch:
+            return
+        await self.pending.acquire()
+        requests, self.batch = self.batch, []
+        if not requests:
+            self.pending.release()
+            return
+        write = asyncio.create_task(self._bulk_write(requests))
+        self.writes.add(write)
+        write.add_done_callback(self.writes.discard)
+
+    async def _bulk_write(self, requests: list):
+        try:
+            result = await asyncio.to_thread(self.collection.bulk_write, requests, ordered=False)
+            self.written += len(requests)
+            logging.debug(
+                f"{self.name}: bulk wrote {len(requests)} records "
+                f"({getattr(result, 'upserted_count', 0)} new)"
+            )
+        except BulkWriteError as e:
+            # Unordered, so only the failed requests are lost
+            errors = len(e.details.get("writeErrors", []))
+            self.written += len(requests) - errors
+            self.failed += errors
+            self.error = self.error or e
+            logging.error(f"{self.name}: {errors} of {len(requests)} writes failed: {e}")
+        except Exception as e:
+            self.failed += len(requests)
+            self.error = self.error or e
+            logging.error(f"{self.name}: bulk write of {len(requests)} records failed: {e}")
+        finally:
+            self.pending.release()
+
+    async def flush(self):
+        await self._start_write()
+        if self.writes:
+            await asyncio.gather(*self.writes)
+        self._raise_error()
+
+    async def close(self, commit: bool = True):
+        try:
+            await self.flush()
+        finally:
+            if self.client:
+                self.client.close()
+            logging.info(f"{self.name}: {self.written} records written, {self.failed} failed")
@@ -0,0 +1,98 @@
+# pool.py
+
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from playwright.async_api import BrowserContext
+
+class PagePool:
+    """
+    A bounded pool of pages that all share one logged-in browser context.
+    Pages are opened lazily up to `size` and reused between tasks. The pool never launches a
+    browser of its own, so every page sees the same cookies (see MVP.md).
+    """
+
+    def __init__(self, context: BrowserContext, size: int):
+        if size < 1:
+            raise ValueError("Page pool size must be at least 1.")
+        self.context = context
+        self.size = size
+        self.semaphore = asyncio.Semaphore(size)
+        self.pages = []
+        self.idle = []
+
+    @asynccontextmanager
+    async def page(self):
+        """
+        Borrow a page from the pool, waiting while all `size` pages are busy.
+        """
+        async with self.semaphore:
+            if self.idle:
+                page = self.idle.pop()
+            else:
+                page = await self.context.new_page()
+                self.pages.append(page)
+                logging.debug(f"Page pool opened page {len(self.pages)}/{self.size}")
+            try:
+                yield page
+            finally:
+                if page.is_closed():
+                    self.pages.remove(page)
+                else:
+                    self.idle.append(page)
+
+    async def map(self, items, worker) -> list:
+        """
+        Run `await worker(page, item)` for every item, at most `size` at a time.
+        Returns the results in item order; a failed item's exception is returned in its place.
+        """
+        async def run(idx, item):
+            async with self.page() as page:
+                try:
+                    return await worker(page, item)
+                except Exception as e:
+                    logging.warning(f"Page pool task {idx} failed: {e}")
+                    raise
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(run(idx, item) for idx, item in enumerate(items, start=1)), return_exceptions=True)
+        elapsed = time.perf_counter() - start
+        failed = sum(1 for result in results if isinstance(result, Exception))
+        throughput = len(results) / elapsed if elapsed > 0 else 0.0
+        logging.info(
+            f"Page pool (size {self.size}) processed {len(results)} items in {elapsed:.1f}s "
+            f"({throughput:.2f} items/s, {failed} failed)"
+        )
+        return results
+
+    async def close(self):
+        """
+        Close every page the pool opened. The context and browser stay open.
+        """
+        for page in self.pages:
+            if not page.is_closed():
+                await page.close()
+        self.pages.clear()
+        self.idle.clear()
+
+async def measure_throughput(context: BrowserContext, items, worker, sizes) -> dict:
+    """
+    Run the same items through pools of each size in turn and log the throughput of each.
+    Returns a mapping of pool size to items per second.
+    """
+    items = list(items)
+    throughput = {}
+    for size in sizes:
+        pool = PagePool(context, size)
+        try:
+            start = time.perf_counter()
+            await pool.map(items, worker)
+            elapsed = time.perf_counter() - start
+        finally:
+            await pool.close()
+        throughput[size] = len(items) / elapsed if elapsed > 0 else 0.0
+
+    for size, items_per_second in throughput.items():
+        logging.info(f"Pool size {size}: {items_per_second:.2f} items/s")
+    return throughput
@@ -0,0 +1,35 @@
+# query.py
+
+import re
+import unicodedata
+from functools import lru_cache
+from urllib.parse import urlencode, quote
+from config import SEARCH_URL
+
+# Hashtags and cashtags are searched as-is, anything else as an exact phrase
+TAG_PATTERN = re.compile(r"^[#$]\w+$")
+
+def normalize_trend_name(name: str) -> str:
+    """
+    Canonical form of a trend name: Unicode NFKC with surrounding and repeated whitespace removed,
+    so the same trend always maps to the same query.
+    """
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", name)).strip()
+
+def build_search_query(name: str) -> str:
+    """
+    The search query for a trend: hashtags and cashtags bare, other names quoted as a phrase.
+    Quotes inside a name are dropped, since they would end the phrase early.
+    """
+    name = normalize_trend_name(name)
+    if TAG_PATTERN.match(name):
+        return name
+    return '"%s"' % name.replace('"', "")
+
+@lru_cache(maxsize=4096)
+def search_url(name: str) -> str:
+    """
+    The canonical search URL of a trend, with the query percent-encoded so characters such as
+    "#", "&" and "+" stay part of the query instead of starting a fragment or another parameter.
+    """
+    return f"{SEARCH_URL}?{urlencode({'q': build_search_query(name)}, quote_via=quote)}"
@@ -0,0 +1,95 @@
+# readiness.py
+
+import re
+import asyncio
+import logging
+from playwright.async_api import Page, TimeoutError as PlaywrightTimeoutError
+
+class Signal:
+    """
+    Something that tells us a page is ready for the next step.
+    Subclasses implement wait(), which returns once the signal fires or raises on timeout.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+
+    async def wait(self, page: Page, timeout: float):
+        raise NotImplementedError
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.name!r})"
+
+class SelectorSignal(Signal):
+    """
+    Fires when an element matching the selector reaches the given state.
+    """
+
+    def __init__(self, selector: str, state: str = "visible", name: str = None):
+        super().__init__(name or selector)
+        self.selector = selector
+        self.state = state
+
+    async def wait(self, page: Page, timeout: float):
+        await page.wait_for_selector(self.selector, state=self.state, timeout=timeout)
+
+class ResponseSignal(Signal):
+    """
+    Fires when the page receives a successful response whose URL matches the regular expression.
+    """
+
+    def __init__(self, url_pattern: str, name: str = None):
+        super().__init__(name or url_pattern)
+        self.url_pattern = re.compile(url_pattern)
+
+    async def wait(self, page: Page, timeout: float):
+        await page.wait_for_event(
+            "response",
+            predicate=lambda response: response.ok and self.url_pattern.search(response.url) is not None,
+            timeout=timeout,
+        )
+
+class PredicateSignal(Signal):
+    """
+    Fires when the JavaScript predicate evaluates to a truthy value in the page.
+    """
+
+    def __init__(self, expression: str, name: str = None):
+        super().__init__(name or expression)
+        self.expression = expression
+
+    async def wait(self, page: Page, timeout: float):
+        await page.wait_for_function(self.expression, timeout=timeout)
+
+async def wait_until_ready(page: Page, signals, timeout: float = 30000, action=None, step: str = "page") -> Signal:
+    """
+    Wait until the first of the given signals fires and return it.
+    The signals are armed before `action` (an async callable such as a navigation or click) runs,
+    so responses triggered by the action are not missed. The remaining waits are cancelled as soon
+    as one signal fires. Raises PlaywrightTimeoutError when none of them fire within `timeout` ms.
+    """
+    tasks = {asyncio.create_task(signal.wait(page, timeout)): signal for signal in signals}
+    try:
+        await asyncio.sleep(0)  # Let every wait register its listener before the action runs
+        if action is not None:
+            await action()
+
+        pending = set(tasks)
+        errors = []
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    signal = tasks[task]
+                    logging.debug(f"'{step}' is ready: {signal!r} fired first.")
+                    return signal
+                errors.append(task.exception())
+        raise PlaywrightTimeoutError(
+            f"'{step}' was not ready after {timeout} ms. None of {list(tasks.values())} fired "
+            f"(first error: {errors[0] if errors else 'none'})"
+        )
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
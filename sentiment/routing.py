@@ -0,0 +1,105 @@
+# routing.py
+
+import logging
+from collections import defaultdict
+from playwright.async_api import BrowserContext, Route
+from config import BLOCKED_RESOURCES, BLOCKED_URL_PATTERNS, BLOCKED_BYTES_ESTIMATE
+
+class ResourceBlocker:
+    """
+    A browser context routing policy that aborts the resource types we don't need for the
+    current stage (login, trends, search) and keeps track of what it saved.
+    Blocked types come from BLOCKED_RESOURCES; the pseudo type "tracking" matches requests
+    whose URL contains one of BLOCKED_URL_PATTERNS.
+    """
+
+    def __init__(self, context: BrowserContext, policy: dict = None):
+        self.context = context
+        self.policy = policy if policy is not None else BLOCKED_RESOURCES
+        self.stage = None
+        self.blocked = defaultdict(lambda: defaultdict(int))  # stage -> resource type -> requests
+        self.allowed = defaultdict(int)  # stage -> requests
+        self.allowed_bytes = defaultdict(int)  # stage -> bytes (from content-length)
+
+    async def install(self):
+        """
+        Register the route handler and response listener on the browser context.
+        """
+        await self.context.route("**/*", self._handle_route)
+        self.context.on("response", self._on_response)
+        logging.info("Resource blocking policy installed on the browser context.")
+
+    def set_stage(self, stage: str):
+        """
+        Switch the policy to the given stage. Unknown stages block nothing.
+        """
+        if stage not in self.policy:
+            logging.warning(f"No resource blocking policy for stage '{stage}'. Nothing will be blocked.")
+        self.stage = stage
+        logging.info(f"Resource blocking stage set to '{stage}'.")
+
+    def _classify(self, resource_type: str, url: str):
+        """
+        Return the blocked type a request falls under for the current stage, or None to let it through.
+        """
+        blocked_types = self.policy.get(self.stage, ())
+        if "tracking" in blocked_types and any(pattern in url for pattern in BLOCKED_URL_PATTERNS):
+            return "tracking"
+        if resource_type in blocked_types:
+            return resource_type
+        return None
+
+    async def _handle_route(self, route: Route):
+        request = route.request
+        blocked_type = self._classify(request.resource_type, request.url)
+        if blocked_type is None:
+            self.allowed[self.stage] += 1
+            await route.continue_()
+            return
+        self.blocked[self.stage][blocked_type] += 1
+        await route.abort("blockedbyclient")
+
+    def _on_response(self, response):
+        try:
+            length = int(response.headers.get("content-length", 0))
+        except ValueError:
+            length = 0
+        self.allowed_bytes[self.stage] += length
+
+    def stats(self) -> dict:
+        """
+        Return the per-stage counts of blocked and allowed requests and the estimated bytes saved.
+        """
+        stats = {}
+        for stage in set(self.blocked) | set(self.allowed):
+            blocked = dict(self.blocked[stage])
+            stats[stage] = {
+                "blocked_requests": sum(blocked.values()),
+                "blocked_by_type": blocked,
+                "estimated_bytes_saved": sum(
+                    count * BLOCKED_BYTES_ESTIMATE.get(resource_type, 0)
+                    for resource_type, count in blocked.items()
+                ),
+                "allowed_requests": self.allowed[stage],
+                "allowed_bytes": self.allowed_bytes[stage],
+            }
+        return stats
+
+    def report(self):
+        """
+        Log the requests and bytes saved by the policy during this run.
+        """
+        stats = self.stats()
+        if not stats:
+            logging.info("Resource blocking: no requests were routed.")
+            return
+        for stage, stage_stats in stats.items():
+            logging.info(
+                f"Resource blocking [{stage}]: blocked {stage_stats['blocked_requests']} requests "
+                f"{stage_stats['blocked_by_type']}, ~{stage_stats['estimated_bytes_saved'] / 1024:.0f} KiB saved; "
+                f"allowed {stage_stats['allowed_requests']} requests, "
+                f"{stage_stats['allowed_bytes'] / 1024:.0f} KiB downloaded"
+            )
+        total_blocked = sum(s["blocked_requests"] for s in stats.values())
+        total_saved = sum(s["estimated_bytes_saved"] for s in stats.values())
+        logging.info(f"Resource blocking total: {total_blocked} requests, ~{total_saved / 1024:.0f} KiB saved")
@@ -0,0 +1,92 @@
+# scheduler.py
+
+import math
+import heapq
+import asyncio
+import logging
+from config import TOPIC_TIME_BUDGET, RUN_DEADLINE, TOPIC_PRIORITY_WEIGHTS
+
+def _as_number(value):
+    """
+    Topics read back from topics.csv hold strings, and empty strings for missing values.
+    """
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def topic_priority(topic: dict, previous_names=(), weights: dict = TOPIC_PRIORITY_WEIGHTS) -> float:
+    """
+    Score a topic from its post volume, trend rank and novelty versus the previous run.
+    Each signal is scaled to roughly 0-1 before it is weighted.
+    """
+    post_count = _as_number(topic.get("post_count")) or 0
+    rank = _as_number(topic.get("rank"))
+    volume = min(math.log10(1 + post_count) / 7, 1.0)  # 10M posts scores 1
+    rank_score = 1 / rank if rank and rank > 0 else 0.0
+    novelty = 0.0 if topic.get("name") in previous_names else 1.0
+    return weights["volume"] * volume + weights["rank"] * rank_score + weights["novelty"] * novelty
+
+class TopicScheduler:
+    """
+    Hands topics to idle pages in priority order, most valuable first.
+    Every topic gets a hard time budget, and no new topic starts once the run deadline has passed,
+    so one slow topic can't hold up the rest and the best topics finish first.
+    """
+
+    def __init__(self, topics: list, previous_names=(), topic_budget: float = TOPIC_TIME_BUDGET,
+                 run_deadline: float = RUN_DEADLINE):
+        self.on_status = None  # Optional `await on_status(topic, status)`, called on every status change
+        self.topic_budget = topic_budget
+        self.run_deadline = run_deadline
+        self.heap = []
+        previous_names = set(previous_names)
+        for order, topic in enumerate(topics):
+            priority = topic_priority(topic, previous_names)
+            heapq.heappush(self.heap, (-priority, order, topic))
+        self.status = {}  # topic name -> done / timeout / failed / skipped
+
+    def __len__(self):
+        return len(self.heap)
+
+    async def _set_status(self, topic: dict, status: str):
+        self.status[topic["name"]] = status
+        if self.on_status:
+            await self.on_status(topic, status)
+
+    async def run(self, pool, worker):
+        """
+        Run `await worker(page, topic)` for every topic, one worker per page of the pool.
+        Returns the status of every topic.
+        """
+        loop = asyncio.get_running_loop()
+        run_stop = loop.time() + self.run_deadline
+
+        async def take_topics():
+            while self.heap:
+                remaining = run_stop - loop.time()
+                if remaining <= 0:
+                    break
+                priority, _, topic = heapq.heappop(self.heap)
+                budget = min(self.topic_budget, remaining)
+                logging.info(f"Scheduling topic '{topic['name']}' (priority {-priority:.2f}, budget {budget:.0f}s)")
+                async with pool.page() as page:
+                    try:
+                        await asyncio.wait_for(worker(page, topic), timeout=budget)
+                        await self._set_status(topic, "done")
+                    except asyncio.TimeoutError:
+                        logging.warning(f"Topic '{topic['name']}' ran out of its {budget:.0f}s budget")
+                        await self._set_status(topic, "timeout")
+                    except Exception as e:
+                        logging.warning(f"Topic '{topic['name']}' failed: {e}")
+                        await self._set_status(topic, "failed")
+
+        await asyncio.gather(*(take_topics() for _ in range(pool.size)))
+
+        while self.heap:
+            _, _, topic = heapq.heappop(self.heap)
+            await self._set_status(topic, "skipped")
+        skipped = sum(1 for status in self.status.values() if status == "skipped")
+        if skipped:
+            logging.warning(f"Run deadline reached. {skipped} topics were not harvested.")
+        return self.status
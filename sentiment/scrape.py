@@ -1,111 +1,406 @@
 # scrape.py
 
+import re
 import asyncio
 import logging
 import csv
+from datetime import datetime, timezone
 from playwright.async_api import Page, TimeoutError, Error
-from config import TRENDING_URL, TOPICS_CSV, SELECTORS
+from config import (
+    EXPLORE_TAB_URL, TRENDING_TABS, TOPICS_CSV, SELECTORS, HARVEST_TARGET_PER_TOPIC, HARVEST_TOPIC_DEADLINE,
+    HARVEST_SCROLL_WAIT, HARVEST_QUEUE_SIZE, HARVEST_MODE,
+)
 from helpers import take_screenshot
+from readiness import SelectorSignal, ResponseSignal, wait_until_ready
+from timeline import SEARCH_TIMELINE_PATTERN, TimelineCapture
+from scroll import ScrollScheduler
+from collector import PostCollector
+from sinks import CsvSink, FanOut
+from query import search_url, normalize_trend_name
+
+TOPIC_FIELDS = ["name", "genre", "post_count", "rank", "search_url", "source_tab"]
+POST_FIELDS = ["id", "author", "text", "created_at", "topic", "scraped_at"]
+
+# Returns the text of every span of every trend item, in page order
+TREND_RECORDS_JS = """
+items => items.map((item, index) => ({
+    rank: index + 1,
+    texts: Array.from(item.querySelectorAll('span'), span => span.innerText),
+}))
+"""
+
+def parse_post_count(text: str):
+    """
+    Convert a post count label such as "12.5K posts" or "1,204 posts" to an integer.
+    Returns None when the label has no number.
+    """
+    match = re.search(r'([\d.,]+)\s*([KM]?)', text)
+    if not match:
+        return None
+    number = float(match.group(1).replace(',', ''))
+    multiplier = {'K': 1_000, 'M': 1_000_000}.get(match.group(2), 1)
+    return int(number * multiplier)
+
+def parse_trend_record(texts: list, rank: int):
+    """
+    Build a topic from the span texts of one trend item: the "Trending in" span is the genre,
+    the "posts" span is the post count and any other span is the name (the last one wins).
+    Returns None when the genre or name is missing.
+    """
+    genre = None
+    name = None
+    post_count = None
+
+    for text in texts:
+        if 'Trending in' in text:
+            genre = text.replace('Trending in', '').strip()
+        elif 'posts' in text:
+            post_count = parse_post_count(text)
+        else:
+            name = text.strip()
+
+    if genre is None or name is None:
+        return None
+
+    return {
+        "name": name,
+        "genre": genre,
+        "post_count": post_count,
+        "rank": rank,
+        "search_url": search_url(name)
+    }
+
+def trend_key(name: str) -> str:
+    """
+    The key under which a trend listed on several explore tabs is stored only once.
+    """
+    return normalize_trend_name(name).casefold()
 
 class XComScraper:
+    # Signals that tell each step the page is ready, whichever fires first
+    READY_SIGNALS = {
+        "trending_page": (
+            SelectorSignal(SELECTORS["TREND_ITEM"], name="trend_item"),
+            ResponseSignal(r"/i/api/(graphql/[^/]+/GenericTimelineById|2/guide\.json)", name="explore_timeline_response"),
+        ),
+        "search_page": (
+            SelectorSignal(SELECTORS["TWEET"], name="tweet"),
+            ResponseSignal(SEARCH_TIMELINE_PATTERN, name="search_timeline_response"),
+        ),
+        "timeline_scroll": (
+            ResponseSignal(SEARCH_TIMELINE_PATTERN, name="search_timeline_response"),
+        ),
+    }
+
     def __init__(self, page: Page):
         self.page = page
         self.folder_path = None  # To be set externally
-        self.topics = []
+        self.sink = None  # Where extracted topics are written, set by perform_scraping
+        self.trend_keys = set()  # Trends already written, so other tabs don't repeat them
 
-    async def navigate_to_trending(self):
+    async def navigate_to_trending(self, page: Page = None, tab: str = TRENDING_TABS[0]):
+        """
+        Open an explore tab on the given page (the scraper's own page by default).
+        """
+        page = page or self.page
+        url = EXPLORE_TAB_URL.format(tab=tab)
         try:
-            logging.info(f"Navigating to trending page: {TRENDING_URL}")
-            await self.page.goto(TRENDING_URL, timeout=60000)
-            await self.page.wait_for_load_state('networkidle', timeout=60000)
-            await take_screenshot(self.page, "trending_page_loaded", self.folder_path)
-            logging.info("Successfully navigated to the trending page")
+            logging.info(f"Navigating to trending page: {url}")
+            await wait_until_ready(
+                page,
+                self.READY_SIGNALS["trending_page"],
+                timeout=60000,
+                action=lambda: page.goto(url, wait_until="commit", timeout=60000),
+                step=f"trending_page:{tab}",
+            )
+            await take_screenshot(page, f"trending_page_loaded_{tab}", self.folder_path)
+            logging.info(f"Successfully navigated to the '{tab}' trending page")
         except TimeoutError:
-            logging.error("Timeout while navigating to the trending page")
-            await take_screenshot(self.page, "navigate_timeout", self.folder_path)
+            logging.error(f"Timeout while navigating to the '{tab}' trending page")
+            await take_screenshot(page, f"navigate_timeout_{tab}", self.folder_path, error=True)
             raise
         except Error as e:
             logging.error(f"Unexpected error during navigation: {e}")
-            await take_screenshot(self.page, "navigate_error", self.folder_path)
+            await take_screenshot(page, f"navigate_error_{tab}", self.folder_path, error=True)
             raise
 
-    async def extract_topics(self):
+    async def store_topic(self, topic: dict) -> bool:
+        """
+        Write a topic to the sink unless an earlier tab already produced the same trend.
+        """
+        key = trend_key(topic["name"])
+        if key in self.trend_keys:
+            return False
+        self.trend_keys.add(key)
+        if self.sink:
+            await self.sink.write(topic)
+        return True
+
+    async def extract_topics(self, page: Page = None, tab: str = TRENDING_TABS[0]) -> list:
+        """
+        Extract the trends of the explore tab open on the given page, tagged with the tab.
+        """
+        page = page or self.page
+        topics = []
         try:
-            logging.info("Waiting for the trend container to be visible")
-            await self.page.wait_for_selector(SELECTORS["TREND_CONTAINER"], timeout=30000)
-            logging.info("Trend container is visible")
+            # The trending_page step may have resolved on the explore API response, before React
+            # rendered the trends, so wait for the items themselves
+            logging.info("Waiting for the trend items to be rendered")
+            await page.wait_for_selector(SELECTORS["TREND_CONTAINER"], timeout=30000)
+            await page.wait_for_selector(SELECTORS["TREND_ITEM"], timeout=30000)
+            logging.info("Trend items are visible")
 
-            trend_elements = await self.page.query_selector_all(SELECTORS["TREND_ITEM"])
-            logging.info(f"Found {len(trend_elements)} trend items")
+            # Collect the text of every span in every trend item in a single round trip
+            records = await page.eval_on_selector_all(SELECTORS["TREND_ITEM"], TREND_RECORDS_JS)
+            logging.info(f"Found {len(records)} trend items on the '{tab}' tab")
 
-            for idx, element in enumerate(trend_elements, start=1):
+            for record in records:
+                idx = record["rank"]
                 try:
-                    # Extract all span elements within the trend item
-                    spans = await element.query_selector_all('span')
-                    genre = None
-                    name = None
-
-                    for span in spans:
-                        text = await span.inner_text()
-                        if 'Trending in' in text:
-                            genre = text.replace('Trending in', '').strip()
-                        elif 'posts' in text:
-                            continue  # We can ignore the posts count
-                        else:
-                            name = text.strip()
-
-                    if genre is None or name is None:
-                        logging.warning(f"Could not find genre or name for trend item {idx}")
-                        await take_screenshot(self.page, f"trend_item_{idx}_missing_data", self.folder_path)
+                    topic = parse_trend_record(record["texts"], idx)
+                    if topic is None:
+                        logging.warning(f"Could not find genre or name for trend item {idx} on the '{tab}' tab")
+                        await take_screenshot(page, f"trend_item_{tab}_{idx}_missing_data", self.folder_path, error=True)
                         continue
-
-                    # Construct search URL
-                    search_query = name.replace(" ", "+")
-                    search_url = f'https://x.com/search?q=%22{search_query}%22'
-
-                    # Create topic dictionary
-                    topic = {
-                        "name": name,
-                        "genre": genre,
-                        "search_url": search_url
-                    }
-                    self.topics.append(topic)
+                    topic["source_tab"] = tab
+                    topics.append(topic)
                     logging.debug(f"Extracted topic {idx}: {topic}")
-
-                    # Optionally, take a screenshot after extracting each topic
-                    await take_screenshot(self.page, f"extract_topic_{idx}", self.folder_path)
                 except Exception as e:
-                    logging.warning(f"Failed to extract trend item {idx}: {e}")
-                    await take_screenshot(self.page, f"extract_topic_{idx}_error", self.folder_path)
+                    logging.warning(f"Failed to extract trend item {idx} on the '{tab}' tab: {e}")
+                    await take_screenshot(page, f"extract_topic_{tab}_{idx}_error", self.folder_path, error=True)
+
+            await take_screenshot(page, f"topics_extracted_{tab}", self.folder_path)
+            return topics
         except TimeoutError:
-            logging.error("Timeout while waiting for the trend container")
-            await take_screenshot(self.page, "trend_container_timeout", self.folder_path)
+            logging.error(f"Timeout while waiting for the trend items on the '{tab}' tab")
+            await take_screenshot(page, f"trend_container_timeout_{tab}", self.folder_path, error=True)
             raise
         except Error as e:
             logging.error(f"Unexpected error during extraction: {e}")
-            await take_screenshot(self.page, "extraction_error", self.folder_path)
+            await take_screenshot(page, f"extraction_error_{tab}", self.folder_path, error=True)
             raise
 
-    def save_to_csv(self):
-        if not self.topics:
-            logging.warning("No topics extracted to save")
-            return
+    async def store_topics(self, topics: list) -> int:
+        stored = 0
+        for topic in topics:
+            if await self.store_topic(topic):
+                stored += 1
+        return stored
+
+    async def scrape_tab(self, page: Page, tab: str) -> list:
+        await self.navigate_to_trending(page, tab)
+        return await self.extract_topics(page, tab)
+
+    async def scrape_trending_tabs(self, pool, tabs=TRENDING_TABS) -> int:
+        """
+        Load every explore tab at the same time on pages of the pool, and store their topics in
+        tab order as soon as every earlier tab is stored. A trend listed on several tabs is kept
+        from the first of them, so its rank and source_tab don't depend on which page loads first.
+        A tab that fails is left out; the stage only fails when every tab does.
+        Returns the number of topics stored.
+        """
+        async def scrape(tab):
+            async with pool.page() as page:
+                return await self.scrape_tab(page, tab)
+
+        tasks = [asyncio.create_task(scrape(tab)) for tab in tabs]
+        stored, loaded, error = 0, 0, None
         try:
-            logging.info(f"Saving {len(self.topics)} topics to {TOPICS_CSV}")
-            with open(TOPICS_CSV, mode='w', newline='', encoding='utf-8') as file:
-                writer = csv.DictWriter(file, fieldnames=["name", "genre", "search_url"])
-                writer.writeheader()
-                writer.writerows(self.topics)
-            logging.info("Data saved successfully to CSV")
-        except Exception as e:
-            logging.error(f"Failed to save data to CSV: {e}")
+            for tab, task in zip(tabs, tasks):
+                try:
+                    topics = await task
+                except Exception as e:
+                    logging.warning(f"Explore tab '{tab}' failed: {e}")
+                    error = error or e
+                    continue
+                loaded += 1
+                stored += await self.store_topics(topics)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        if not loaded:
+            raise error
+        logging.info(f"Stored {stored} distinct topics from {loaded}/{len(tabs)} tabs")
+        return stored
+
+    def load_topics(self, path: str = TOPICS_CSV) -> list:
+        """
+        Read the topics written by perform_scraping back from disk.
+        Search URLs are rebuilt, so files written before the query builder get canonical ones.
+        """
+        try:
+            with open(path, mode='r', newline='', encoding='utf-8') as file:
+                topics = list(csv.DictReader(file))
+            for topic in topics:
+                topic["search_url"] = search_url(topic["name"])
+            logging.info(f"Loaded {len(topics)} topics from {path}")
+            return topics
+        except FileNotFoundError:
+            logging.warning(f"No topics file found at {path}")
+            return []
+
+    async def visit_topic(self, page: Page, topic: dict):
+        """
+        Open a topic's search page on the given page (usually one borrowed from a PagePool)
+        and wait until its timeline is ready.
+        """
+        try:
+            logging.info(f"Opening search page for topic '{topic['name']}'")
+            await wait_until_ready(
+                page,
+                self.READY_SIGNALS["search_page"],
+                timeout=30000,
+                action=lambda: page.goto(topic["search_url"], wait_until="commit", timeout=60000),
+                step=f"search_page:{topic['name']}",
+            )
+            logging.info(f"Search page ready for topic '{topic['name']}'")
+            return topic
+        except TimeoutError:
+            logging.error(f"Timeout while opening the search page for topic '{topic['name']}'")
+            await take_screenshot(page, f"search_page_timeout_{topic['name']}", self.folder_path, error=True)
             raise
+        except Error as e:
+            logging.error(f"Unexpected error opening the search page for topic '{topic['name']}': {e}")
+            await take_screenshot(page, f"search_page_error_{topic['name']}", self.folder_path, error=True)
+            raise
+
+    async def harvest_topic(self, page: Page, topic: dict, target: int = HARVEST_TARGET_PER_TOPIC,
+                            deadline: float = HARVEST_TOPIC_DEADLINE, mode: str = HARVEST_MODE, seen=None,
+                            index=None):
+        """
+        Open the topic's search page and yield its posts as soon as they are parsed, scrolling the
+        timeline for more until `target` posts were yielded or `deadline` seconds have passed.
+        In "dom" mode posts are collected from the rendered timeline by an in-page PostCollector;
+        in "network" mode they are parsed from the SearchTimeline responses the page receives,
+        which also sees posts that were never rendered or already scrolled out of view.
+        Post IDs in `seen` (e.g. from a checkpoint) are skipped, and so are posts already in the
+        cross-run PostIndex `index`.
+        """
+        capture = TimelineCapture(page, known=index) if mode == "network" else None
+        if capture:
+            capture.start()  # Before navigating, so the first timeline response is captured too
+        try:
+            await self.visit_topic(page, topic)
+            if capture:
+                source = capture
+            else:
+                source = PostCollector(page)
+                await source.install()
+            loop = asyncio.get_running_loop()
+            stop_at = loop.time() + deadline
+            scheduler = ScrollScheduler(seen=seen)
+            harvested = 0
+
+            while harvested < target and loop.time() < stop_at:
+                records = await source.drain()
+                new_records = scheduler.filter_new(records)
+                # Progress counts every new ID, indexed or not, so a recurring trend whose timeline
+                # starts with posts stored by earlier runs isn't mistaken for a stagnant one
+                scheduler.record(len(new_records))
+                if index is not None:
+                    new_records = [record for record in new_records if record["id"] not in index]
+                for record in new_records[:target - harvested]:
+                    harvested += 1
+                    yield {
+                        **record,
+                        "topic": topic["name"],
+                        "scraped_at": datetime.now(timezone.utc).isoformat(),
+                    }
+                if harvested >= target:
+                    break
+                if scheduler.stagnated:
+                    logging.info(f"Timeline for topic '{topic['name']}' stopped producing new posts after {scheduler.steps} scrolls")
+                    break
 
-    async def perform_scraping(self):
+                # Scroll and wait for the timeline to fetch the next page of posts
+                try:
+                    await wait_until_ready(
+                        page,
+                        self.READY_SIGNALS["timeline_scroll"],
+                        timeout=HARVEST_SCROLL_WAIT,
+                        action=lambda: page.evaluate(f"window.scrollBy(0, {scheduler.step})"),
+                        step=f"timeline_scroll:{topic['name']}",
+                    )
+                except TimeoutError:
+                    logging.debug(f"No new timeline page for topic '{topic['name']}' after scrolling")
+
+            logging.info(f"Harvested {harvested} posts for topic '{topic['name']}' ({mode} mode)")
+        finally:
+            if capture:
+                capture.stop()
+
+    async def harvest(self, pool, scheduler, checkpoint=None, index=None,
+                      target: int = HARVEST_TARGET_PER_TOPIC, deadline: float = HARVEST_TOPIC_DEADLINE):
+        """
+        Harvest the topics of a TopicScheduler concurrently on pages from the PagePool, most valuable
+        first, and yield the posts of all topics as one stream, in the order they are parsed.
+        With a HarvestCheckpoint, topics continue from their recorded posts instead of starting over.
+        A topic's status reaches the checkpoint through the same queue as its posts, so it is only
+        recorded once the caller has consumed every post of the topic.
+        Posts already in the PostIndex `index` are skipped.
+        """
+        queue = asyncio.Queue(maxsize=HARVEST_QUEUE_SIZE)
+        finished = object()
+
+        async def queue_status(topic, status):
+            await queue.put((topic["name"], status))
+
+        scheduler.on_status = queue_status
+
+        async def harvest_into_queue(page, topic):
+            seen, harvested = None, 0
+            if checkpoint:
+                progress = checkpoint.topic(topic["name"])
+                seen, harvested = progress["seen_ids"], progress["count"]
+            if harvested >= target:
+                return
+            async for post in self.harvest_topic(page, topic, target - harvested, deadline, seen=seen, index=index):
+                await queue.put(post)
+
+        async def produce():
+            try:
+                await scheduler.run(pool, harvest_into_queue)
+            finally:
+                await queue.put(finished)
+
+        producer = asyncio.create_task(produce())
         try:
-            await self.navigate_to_trending()
-            await self.extract_topics()
-            self.save_to_csv()
+            while (item := await queue.get()) is not finished:
+                if isinstance(item, tuple):
+                    if checkpoint:
+                        checkpoint.set_status(*item)
+                    continue
+                yield item
+        finally:
+            producer.cancel()
+            await asyncio.gather(producer, return_exceptions=True)
+
+    async def perform_scraping(self, pool=None, sinks=()) -> int:
+        """
+        Scrape the trends and stream them to TOPICS_CSV and any other `sinks`. With a PagePool every
+        tab in TRENDING_TABS is loaded concurrently; without one only the first tab is scraped, on
+        the scraper's own page. TOPICS_CSV is only replaced when the stage succeeds with at least
+        one topic. Returns the number of topics stored.
+        """
+        topics_csv = CsvSink(TOPICS_CSV, TOPIC_FIELDS)
+        self.sink = FanOut([topics_csv, *sinks])
+        self.trend_keys.clear()
+        try:
+            if pool:
+                stored = await self.scrape_trending_tabs(pool)
+            else:
+                await self.navigate_to_trending()
+                stored = await self.store_topics(await self.extract_topics())
         except Exception as e:
             logging.error(f"An error occurred during scraping: {e}")
+            await self.sink.close(commit=False)
             raise
+        if not stored:
+            logging.warning("No topics extracted to save")
+        await self.sink.close(commit=stored > 0)
+        # The other topic sinks are optional, but the harvest reads its topics from topics.csv
+        worker = next(worker for worker in self.sink.workers if worker.sink is topics_csv)
+        if worker.error:
+            raise worker.error
+        return stored
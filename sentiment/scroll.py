@@ -0,0 +1,59 @@
+# scroll.py
+
+import logging
+from config import (
+    HARVEST_SCROLL_STEP, HARVEST_SCROLL_MIN_STEP, HARVEST_SCROLL_MAX_STEP,
+    HARVEST_SCROLL_TARGET_NEW, HARVEST_MAX_STAGNANT_SCROLLS,
+)
+
+class ScrollScheduler:
+    """
+    Plans the scrolling of a virtualized timeline, where the same post is rendered many times.
+    It keeps the IDs of the posts already seen and sizes each scroll step from how many new posts
+    the previous one produced, aiming for about `target_new` new posts per step. A topic counts as
+    stagnated once `max_stagnant` scrolls in a row added nothing new.
+    """
+
+    def __init__(self, seen=None, step: int = HARVEST_SCROLL_STEP, min_step: int = HARVEST_SCROLL_MIN_STEP,
+                 max_step: int = HARVEST_SCROLL_MAX_STEP, target_new: int = HARVEST_SCROLL_TARGET_NEW,
+                 max_stagnant: int = HARVEST_MAX_STAGNANT_SCROLLS):
+        self.seen = set(seen or ())
+        self.step = step
+        self.min_step = min_step
+        self.max_step = max_step
+        self.target_new = target_new
+        self.max_stagnant = max_stagnant
+        self.stagnant = 0
+        self.steps = 0
+
+    def filter_new(self, records: list) -> list:
+        """
+        Return the records whose ID has not been seen before and remember their IDs.
+        """
+        new = []
+        for record in records:
+            if not record.get("id") or record["id"] in self.seen:
+                continue
+            self.seen.add(record["id"])
+            new.append(record)
+        return new
+
+    def record(self, new_count: int):
+        """
+        Update the step size and stagnation count with the number of new posts the last step produced.
+        """
+        self.steps += 1
+        if new_count == 0:
+            # Nothing new: either the timeline is still loading or we are inside already seen posts,
+            # so jump further next time
+            self.stagnant += 1
+            self.step = min(self.step * 2, self.max_step)
+        else:
+            self.stagnant = 0
+            self.step = int(self.step * self.target_new / new_count)
+            self.step = max(self.min_step, min(self.step, self.max_step))
+        logging.debug(f"Scroll step {self.steps}: {new_count} new posts, next step {self.step}px, {self.stagnant} stagnant")
+
+    @property
+    def stagnated(self) -> bool:
+        return self.stagnant >= self.max_stagnant
@@ -0,0 +1,316 @@
+# sinks.py
+
+import os
+import csv
+import json
+import time
+import asyncio
+import sqlite3
+import logging
+from datetime import datetime, timezone
+from config import (
+    CSV_BATCH_SIZE, SQLITE_BATCH_SIZE, SINK_QUEUE_SIZE, SINK_BUFFER_SIZE, SINK_METRICS_INTERVAL,
+)
+
+class Sink:
+    """
+    Where scraped records go. Records are written one at a time as they are scraped; a sink may
+    buffer them, but must have stored everything it was given once flush() returns.
+    close(commit=False) is for failed runs: the sink keeps what it stored without publishing it.
+    """
+
+    name = None  # Shown in logs and metrics; the class name when unset
+
+    async def write(self, record: dict):
+        raise NotImplementedError
+
+    async def flush(self):
+        pass
+
+    async def close(self, commit: bool = True):
+        await self.flush()
+
+class CsvSink(Sink):
+    """
+    Appends rows to a temporary file next to `path` in batches of `batch_size`, and moves it over
+    `path` on close, so readers never see a half-written file and only one batch is held in memory.
+    A failed run leaves the rows written so far in the temporary file; with `resume` the next run
+    appends to them instead of starting the file over. Batches are written and synced to disk on a
+    worker thread.
+    """
+
+    def __init__(self, path: str, fields: list, batch_size: int = CSV_BATCH_SIZE, resume: bool = False):
+        self.name = os.path.basename(path)
+        self.path = path
+        self.temp_path = f"{path}.tmp"
+        self.batch_size = batch_size
+        self.batch = []
+        self.rows = 0
+        append = resume and os.path.exists(self.temp_path)
+        self.file = open(self.temp_path, mode='a' if append else 'w', newline='', encoding='utf-8')
+        self.writer = csv.DictWriter(self.file, fieldnames=fields, extrasaction="ignore")
+        if append:
+            logging.info(f"Appending to the rows of the unfinished run in {self.temp_path}")
+        else:
+            self.writer.writeheader()
+
+    async def write(self, record: dict):
+        self.batch.append(record)
+        self.rows += 1
+        if len(self.batch) >= self.batch_size:
+            await self.flush()
+
+    def _write_batch(self, rows: list):
+        self.writer.writerows(rows)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    async def flush(self):
+        rows, self.batch = self.batch, []
+        await asyncio.to_thread(self._write_batch, rows)
+
+    async def close(self, commit: bool = True):
+        await self.flush()
+        self.file.close()
+        if commit:
+            os.replace(self.temp_path, self.path)
+            logging.info(f"Saved {self.rows} rows to {self.path}")
+        else:
+            logging.warning(f"Kept {self.rows} rows of an unfinished run in {self.temp_path}")
+
+class JsonlSink(Sink):
+    """
+    Appends one JSON document per line to `path`, across runs. The file is line buffered, so
+    every record written is on disk.
+    """
+
+    def __init__(self, path: str):
+        self.name = os.path.basename(path)
+        self.path = path
+        self.rows = 0
+        self.file = open(path, "a", encoding="utf-8", buffering=1)
+
+    async def write(self, record: dict):
+        self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.rows += 1
+
+    async def close(self, commit: bool = True):
+        self.file.close()
+        logging.info(f"Appended {self.rows} rows to {self.path}")
+
+# Table layout of the SQLite backend. Posts are upserted on their ID, like the MongoDB sink;
+# every trend stage adds a snapshot of each topic.
+SQLITE_TABLES = {
+    "posts": {
+        "columns": ["id", "author", "text", "created_at", "topic", "scraped_at"],
+        "schema": [
+            """CREATE TABLE IF NOT EXISTS posts (
+                id TEXT PRIMARY KEY,
+                author TEXT,
+                text TEXT,
+                created_at TEXT,
+                topic TEXT,
+                scraped_at TEXT
+            )""",
+            "CREATE INDEX IF NOT EXISTS posts_topic_scraped_at ON posts (topic, scraped_at)",
+        ],
+        "conflict": "ON CONFLICT (id) DO UPDATE SET text = excluded.text, topic = excluded.topic, scraped_at = excluded.scraped_at",
+    },
+    "topics": {
+        "columns": ["name", "genre", "post_count", "rank", "search_url", "source_tab", "scraped_at"],
+        "schema": [
+            """CREATE TABLE IF NOT EXISTS topics (
+                name TEXT NOT NULL,
+                genre TEXT,
+                post_count INTEGER,
+                rank INTEGER,
+                search_url TEXT,
+                source_tab TEXT,
+                scraped_at TEXT
+            )""",
+            "CREATE INDEX IF NOT EXISTS topics_name_scraped_at ON topics (name, scraped_at)",
+        ],
+        "conflict": "",
+    },
+}
+
+class SqliteSink(Sink):
+    """
+    Writes posts or topics to a table of a local SQLite database in WAL mode, one transaction per
+    `batch_size` records, so a run needs no database service. Batches are written on a worker
+    thread and readers can query the database while a run is writing to it.
+    """
+
+    def __init__(self, path: str, table: str, batch_size: int = SQLITE_BATCH_SIZE):
+        if table not in SQLITE_TABLES:
+            raise ValueError(f"Unknown SQLite table: {table}")
+        self.name = f"{os.path.basename(path)}:{table}"
+        self.path = path
+        self.table = table
+        self.columns = SQLITE_TABLES[table]["columns"]
+        self.batch_size = batch_size
+        self.batch = []
+        self.rows = 0
+        # Only one thread uses the connection at a time: flush() waits for each batch
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")  # Durable at every checkpoint, safe in WAL mode
+        with self.connection:
+            for statement in SQLITE_TABLES[table]["schema"]:
+                self.connection.execute(statement)
+        placeholders = ", ".join("?" for _ in self.columns)
+        self.insert = (
+            f"INSERT INTO {table} ({', '.join(self.columns)}) VALUES ({placeholders}) "
+            f"{SQLITE_TABLES[table]['conflict']}"
+        )
+        self.scraped_at = datetime.now(timezone.utc).isoformat()  # For records without their own
+
+    async def write(self, record: dict):
+        self.batch.append(tuple(
+            record.get(column, self.scraped_at if column == "scraped_at" else None) for column in self.columns
+        ))
+        self.rows += 1
+        if len(self.batch) >= self.batch_size:
+            await self.flush()
+
+    def _write_batch(self, rows: list):
+        with self.connection:
+            self.connection.executemany(self.insert, rows)
+
+    async def flush(self):
+        if not self.batch:
+            return
+        rows, self.batch = self.batch, []
+        await asyncio.to_thread(self._write_batch, rows)
+
+    async def close(self, commit: bool = True):
+        await self.flush()
+        self.connection.close()
+        logging.info(f"Saved {self.rows} rows to the {self.table} table of {self.path}")
+
+class SinkWorker:
+    """
+    Writes the records queued for one sink of a FanOut and keeps its metrics. A sink that fails is
+    cut off: its queue keeps draining so the other sinks are not held up.
+    """
+
+    def __init__(self, sink: Sink, buffer_size: int):
+        self.sink = sink
+        self.name = sink.name or type(sink).__name__
+        self.queue = asyncio.Queue(buffer_size)
+        self.written = 0
+        self.write_time = 0.0  # Seconds spent inside the sink's write()
+        self.lag = 0.0  # Seconds between the last record entering the FanOut and this sink storing it
+        self.max_lag = 0.0
+        self.error = None
+
+    async def run(self):
+        while True:
+            queued_at, record = await self.queue.get()
+            try:
+                if self.error is None:
+                    start = time.perf_counter()
+                    await self.sink.write(record)
+                    self.write_time += time.perf_counter() - start
+                    self.written += 1
+                    self.lag = time.monotonic() - queued_at
+                    self.max_lag = max(self.max_lag, self.lag)
+            except Exception as e:
+                self.error = e
+                logging.error(f"Sink {self.name} failed, its remaining records are dropped: {e}")
+            finally:
+                self.queue.task_done()
+
+    async def flush(self):
+        """
+        Flush the sink, cutting it off instead of raising when it fails.
+        """
+        if self.error is not None:
+            return
+        try:
+            await self.sink.flush()
+        except Exception as e:
+            self.error = e
+            logging.error(f"Sink {self.name} failed to flush, its remaining records are dropped: {e}")
+
+    def metrics(self) -> dict:
+        return {
+            "written": self.written,
+            "pending": self.queue.qsize(),
+            "lag_s": round(self.lag, 3),
+            "max_lag_s": round(self.max_lag, 3),
+            "write_s": round(self.write_time, 3),
+            "failed": self.error is not None,
+        }
+
+class FanOut(Sink):
+    """
+    Feeds several sinks from one bounded queue. Every sink is written by its own task from its own
+    bounded buffer, so a slow sink falls behind on its own instead of delaying the others; only
+    when its buffer and the queue are both full does write() wait, which bounds memory.
+    Each sink's lag is logged every `metrics_interval` seconds and when the FanOut is closed.
+    """
+
+    def __init__(self, sinks: list, queue_size: int = SINK_QUEUE_SIZE, buffer_size: int = SINK_BUFFER_SIZE,
+                 metrics_interval: float = SINK_METRICS_INTERVAL):
+        self.queue = asyncio.Queue(queue_size)
+        self.workers = [SinkWorker(sink, buffer_size) for sink in sinks]
+        self.metrics_interval = metrics_interval
+        self.tasks = []
+
+    @property
+    def errors(self) -> list:
+        return [worker.error for worker in self.workers if worker.error is not None]
+
+    def _start(self):
+        self.tasks = [asyncio.create_task(self._dispatch()), asyncio.create_task(self._report_periodically())]
+        self.tasks += [asyncio.create_task(worker.run()) for worker in self.workers]
+
+    async def write(self, record: dict):
+        if not self.tasks:
+            self._start()
+        await self.queue.put((time.monotonic(), record))
+
+    async def _dispatch(self):
+        while True:
+            item = await self.queue.get()
+            for worker in self.workers:
+                await worker.queue.put(item)
+            self.queue.task_done()
+
+    async def _report_periodically(self):
+        while True:
+            await asyncio.sleep(self.metrics_interval)
+            self.report()
+
+    async def _drain(self):
+        await self.queue.join()
+        for worker in self.workers:
+            await worker.queue.join()
+
+    async def flush(self):
+        """
+        Wait until every queued record reached its sinks, then flush the sinks.
+        """
+        await self._drain()
+        await asyncio.gather(*(worker.flush() for worker in self.workers))
+
+    async def close(self, commit: bool = True):
+        await self._drain()
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        for worker in self.workers:
+            try:
+                await worker.sink.close(commit=commit and worker.error is None)
+            except Exception as e:
+                worker.error = worker.error or e
+                logging.error(f"Sink {worker.name} failed to close: {e}")
+        self.report()
+
+    def metrics(self) -> dict:
+        return {worker.name: worker.metrics() for worker in self.workers}
+
+    def report(self):
+        for name, metrics in self.metrics().items():
+            logging.info(f"Sink {name}: " + ", ".join(f"{key} {value}" for key, value in metrics.items()))
@@ -0,0 +1,105 @@
+# test_timeline.py
+
+import os
+import json
+from timeline import parse_timeline_payload
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+def load_fixture(name: str) -> dict:
+    with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+        return json.load(f)
+
+def timeline_payload(*entries) -> dict:
+    return {"data": {"search_by_raw_query": {"search_timeline": {"timeline": {
+        "instructions": [{"type": "TimelineAddEntries", "entries": list(entries)}]
+    }}}}}
+
+def tweet_entry(result: dict) -> dict:
+    return {"entryId": f"tweet-{result.get('rest_id')}", "content": {
+        "entryType": "TimelineTimelineItem",
+        "itemContent": {"itemType": "TimelineTweet", "tweet_results": {"result": result}},
+    }}
+
+def test_fixture_pages():
+    pages = [
+        ("search_timeline_0.json", 20, "search_timeline_1"),
+        ("search_timeline_1.json", 22, "search_timeline_2"),
+        ("search_timeline_2.json", 20, "search_timeline_end"),
+    ]
+    ids = set()
+    for name, count, cursor in pages:
+        records, bottom = parse_timeline_payload(load_fixture(name))
+        assert len(records) == count
+        assert bottom == cursor
+        ids.update(record["id"] for record in records)
+    assert len(ids) == 62
+
+def test_end_of_timeline():
+    assert parse_timeline_payload(load_fixture("search_timeline_end.json")) == ([], None)
+
+def test_record_fields():
+    records, _ = parse_timeline_payload(load_fixture("search_timeline_0.json"))
+    assert records[0] == {
+        "id": "1861000000000000000",
+        "author": "newsdesk",
+        "text": "Markets are moving fast today, keep an eye on the open 📈",
+        "created_at": "2024-11-25T20:10:00.000Z",
+    }
+    records, _ = parse_timeline_payload(load_fixture("search_timeline_2.json"))
+    assert records[0] == {
+        "id": "1861000000002000006",
+        "author": "cryptofan21",
+        "text": "This is huge news for everyone following the story",
+        "created_at": "2024-11-25T20:10:14.000Z",
+    }
+
+def test_visibility_results():
+    records, _ = parse_timeline_payload(load_fixture("search_timeline_1.json"))
+    by_id = {record["id"]: record for record in records}
+    assert by_id["1861000000001031679"]["author"] == "dailybrief"
+    assert by_id["1861000000001102950"]["author"] == "cryptofan21"
+    assert by_id["1861000000001102950"]["text"] == "Thread: everything you need to know 🧵👇"
+    assert by_id["1861000000001102950"]["created_at"].endswith(".000Z")
+
+def test_conversation_module():
+    records, _ = parse_timeline_payload(load_fixture("search_timeline_1.json"))
+    by_id = {record["id"]: record for record in records}
+    # Both items of the conversation, the first wrapped in TweetWithVisibilityResults
+    assert by_id["1861000000001316763"] == {
+        "id": "1861000000001316763",
+        "author": "dailybrief",
+        "text": "Not sure how I feel about this one 🤔",
+        "created_at": "2024-11-25T20:50:07.000Z",
+    }
+    assert by_id["1861000000001324682"] == {
+        "id": "1861000000001324682",
+        "author": "newsdesk",
+        "text": "This is huge news for everyone following the story",
+        "created_at": "2024-11-25T21:51:07.000Z",
+    }
+
+def test_note_tweet_text():
+    long_text = "A long post " * 40
+    payload = timeline_payload(tweet_entry({
+        "__typename": "Tweet",
+        "rest_id": "1",
+        "core": {"user_results": {"result": {"legacy": {"screen_name": "longform"}}}},
+        "legacy": {"full_text": long_text[:280], "created_at": "Mon Nov 25 20:10:00 +0000 2024"},
+        "note_tweet": {"note_tweet_results": {"result": {"text": long_text}}},
+    }))
+    records, cursor = parse_timeline_payload(payload)
+    assert records == [{
+        "id": "1", "author": "longform", "text": long_text, "created_at": "2024-11-25T20:10:00.000Z",
+    }]
+    assert cursor is None
+
+def test_known_posts_are_id_only():
+    payload = load_fixture("search_timeline_0.json")
+    records, _ = parse_timeline_payload(payload)
+    known = {records[0]["id"]}
+    indexed, cursor = parse_timeline_payload(payload, known)
+    assert len(indexed) == len(records)
+    assert indexed[0] == {"id": records[0]["id"]}
+    assert indexed[1:] == records[1:]
+    assert cursor == "search_timeline_1"
@@ -0,0 +1,131 @@
+# timeline.py
+
+import re
+import json
+import asyncio
+import logging
+from datetime import datetime, timezone
+from playwright.async_api import Page, Response
+
+# Requests the search page makes for each page of its timeline
+SEARCH_TIMELINE_PATTERN = r"/i/api/graphql/[^/]+/SearchTimeline"
+
+def _tweet_results(entry: dict):
+    """
+    Yield the tweet results of a timeline entry. Single posts are TimelineTimelineItem entries,
+    conversations are TimelineTimelineModule entries holding several items.
+    """
+    content = entry.get("content", {})
+    if "items" in content:
+        item_contents = [item.get("item", {}).get("itemContent", {}) for item in content["items"]]
+    else:
+        item_contents = [content.get("itemContent", {})]
+    for item_content in item_contents:
+        result = item_content.get("tweet_results", {}).get("result")
+        if not result:
+            continue
+        if result.get("__typename") == "TweetWithVisibilityResults":
+            result = result.get("tweet", {})
+        yield result
+
+def _parse_created_at(value: str):
+    """
+    Convert the API's "Mon Nov 25 20:10:00 +0000 2024" timestamps to the UTC ISO format of the
+    DOM's <time datetime="2024-11-25T20:10:00.000Z"> attributes.
+    """
+    try:
+        created_at = datetime.strptime(value, "%a %b %d %H:%M:%S %z %Y")
+        return created_at.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+    except (TypeError, ValueError):
+        return None
+
+def parse_timeline_payload(payload: dict, known=None):
+    """
+    Parse a SearchTimeline response into post records with the same fields the DOM harvester
+    produces (id, author, text, created_at). Returns the records and the bottom cursor, if any.
+    Posts whose ID is in `known` (e.g. a PostIndex) are returned as ID-only records without being
+    parsed, so callers still see the timeline advance.
+    """
+    instructions = (
+        payload.get("data", {})
+        .get("search_by_raw_query", {})
+        .get("search_timeline", {})
+        .get("timeline", {})
+        .get("instructions", [])
+    )
+    records = []
+    cursor = None
+    for instruction in instructions:
+        entries = instruction.get("entries") or ([instruction["entry"]] if "entry" in instruction else [])
+        for entry in entries:
+            content = entry.get("content", {})
+            if content.get("cursorType") == "Bottom":
+                cursor = content.get("value")
+                continue
+            for tweet in _tweet_results(entry):
+                legacy = tweet.get("legacy", {})
+                user = tweet.get("core", {}).get("user_results", {}).get("result", {}).get("legacy", {})
+                post_id = tweet.get("rest_id") or legacy.get("id_str")
+                if not post_id:
+                    continue
+                if known is not None and post_id in known:
+                    records.append({"id": post_id})
+                    continue
+                # Long posts keep their full text in note_tweet
+                note = tweet.get("note_tweet", {}).get("note_tweet_results", {}).get("result", {})
+                records.append({
+                    "id": post_id,
+                    "author": user.get("screen_name"),
+                    "text": note.get("text") or legacy.get("full_text", ""),
+                    "created_at": _parse_created_at(legacy.get("created_at")),
+                })
+    return records, cursor
+
+class TimelineCapture:
+    """
+    Listens for the page's SearchTimeline responses and parses their payloads into post records,
+    so posts are read from the structured data instead of the rendered timeline.
+    """
+
+    def __init__(self, page: Page, url_pattern: str = SEARCH_TIMELINE_PATTERN, known=None):
+        self.page = page
+        self.known = known
+        self.url_pattern = re.compile(url_pattern)
+        self.records = []
+        self.pending = set()
+        self.responses = 0
+        self.cursor = None
+
+    def start(self):
+        self.page.on("response", self._on_response)
+
+    def stop(self):
+        self.page.remove_listener("response", self._on_response)
+
+    def _on_response(self, response: Response):
+        if not response.ok or not self.url_pattern.search(response.url):
+            return
+        task = asyncio.create_task(self._read(response))
+        self.pending.add(task)
+        task.add_done_callback(self.pending.discard)
+
+    async def _read(self, response: Response):
+        try:
+            payload = json.loads(await response.body())
+        except Exception as e:
+            logging.warning(f"Failed to read timeline response {response.url}: {e}")
+            return
+        records, cursor = parse_timeline_payload(payload, self.known)
+        self.responses += 1
+        self.cursor = cursor or self.cursor
+        self.records.extend(records)
+        logging.debug(f"Captured {len(records)} posts from timeline response {self.responses}")
+
+    async def drain(self) -> list:
+        """
+        Return the records captured since the last drain, waiting for responses still being read.
+        """
+        if self.pending:
+            await asyncio.gather(*self.pending, return_exceptions=True)
+        records, self.records = self.records, []
+        return records
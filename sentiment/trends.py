@@ -0,0 +1,96 @@
+# trends.py
+
+import os
+import json
+import logging
+from datetime import datetime, timezone
+from config import (
+    TREND_HISTORY_PATH, TREND_HISTORY_MAX_SNAPSHOTS, TREND_RANK_CHANGE, TREND_VOLUME_CHANGE,
+)
+
+def _as_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def trend_changed(snapshot: dict, topic: dict, rank_change: int = TREND_RANK_CHANGE,
+                  volume_change: float = TREND_VOLUME_CHANGE) -> bool:
+    """
+    Whether a trend moved at least `rank_change` places or its post count changed by at least
+    `volume_change` (a fraction of the previous count) since the snapshot.
+    """
+    old_rank, new_rank = _as_int(snapshot.get("rank")), _as_int(topic.get("rank"))
+    if old_rank is not None and new_rank is not None and abs(new_rank - old_rank) >= rank_change:
+        return True
+    old_posts, new_posts = _as_int(snapshot.get("post_count")), _as_int(topic.get("post_count"))
+    if old_posts and new_posts is not None and abs(new_posts - old_posts) / old_posts >= volume_change:
+        return True
+    return False
+
+class TrendHistory:
+    """
+    Every trend seen across runs with its first_seen and last_seen times and its rank and post
+    count in the most recent snapshots, kept in trend_history.json instead of being thrown away
+    when topics.csv is overwritten.
+    """
+
+    def __init__(self, path: str = TREND_HISTORY_PATH, max_snapshots: int = TREND_HISTORY_MAX_SNAPSHOTS):
+        self.path = path
+        self.max_snapshots = max_snapshots
+        self.trends = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.trends = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.warning(f"Starting a new trend history, failed to read {path}: {e}")
+
+    def names(self) -> set:
+        return set(self.trends)
+
+    def last_snapshot_names(self) -> set:
+        """
+        The trends of the most recent snapshot, i.e. the ones listed by the previous run.
+        """
+        return {name for name, trend in self.trends.items() if trend.get("in_last_snapshot")}
+
+    def refresh(self, topics: list, now: str = None) -> dict:
+        """
+        Record a snapshot of the current trends and return how they differ from the previous one:
+        "new" and "changed" topics are worth harvesting, "unchanged" ones are not, and "dropped"
+        lists the names of trends that were in the previous snapshot but are gone now.
+        """
+        now = now or datetime.now(timezone.utc).isoformat()
+        previous_snapshot = self.last_snapshot_names()
+        diff = {"new": [], "changed": [], "unchanged": [], "dropped": []}
+
+        for trend in self.trends.values():
+            trend["in_last_snapshot"] = False
+        for topic in topics:
+            trend = self.trends.get(topic["name"])
+            if trend is None:
+                trend = self.trends[topic["name"]] = {"first_seen": now, "snapshots": []}
+                diff["new"].append(topic)
+            elif not trend["snapshots"] or trend_changed(trend["snapshots"][-1], topic):
+                diff["changed"].append(topic)
+            else:
+                diff["unchanged"].append(topic)
+            trend["last_seen"] = now
+            trend["in_last_snapshot"] = True
+            trend["snapshots"].append({"seen_at": now, "rank": topic.get("rank"), "post_count": topic.get("post_count")})
+            del trend["snapshots"][:-self.max_snapshots]
+
+        current = {topic["name"] for topic in topics}
+        diff["dropped"] = sorted(previous_snapshot - current)
+        logging.info(
+            f"Trend refresh: {len(diff['new'])} new, {len(diff['changed'])} changed, "
+            f"{len(diff['unchanged'])} unchanged, {len(diff['dropped'])} dropped"
+        )
+        return diff
+
+    def save(self):
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.trends, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.path)